@@ -225,6 +225,53 @@ class CacheService:
             logger.error(f"Ошибка инкремента счетчика {key}: {e}")
             return None
     
+    def increment_window(self, key: str, ttl: int) -> Optional[int]:
+        """
+        Атомарный инкремент счетчика окна (INCR + EXPIRE одной транзакцией)
+        
+        Args:
+            key: Ключ счетчика
+            ttl: Время жизни ключа в секундах
+        
+        Returns:
+            Новое значение счетчика
+        """
+        if not self.available:
+            return None
+        
+        try:
+            # Один MULTI/EXEC вместо отдельных GET, SET и INCR: один сетевой обмен и нет гонки
+            pipe = self.redis_client.pipeline()
+            pipe.incr(key)
+            pipe.expire(key, ttl)
+            count, _ = pipe.execute()
+            return count
+            
+        except Exception as e:
+            logger.error(f"Ошибка инкремента счетчика {key}: {e}")
+            return None
+    
+    def get_counter(self, key: str) -> int:
+        """
+        Получение значения счетчика, созданного increment/increment_window
+        
+        Args:
+            key: Ключ счетчика
+        
+        Returns:
+            Значение счетчика (0 если ключа нет)
+        """
+        if not self.available:
+            return 0
+        
+        try:
+            value = self.redis_client.get(key)
+            return int(value) if value is not None else 0
+            
+        except Exception as e:
+            logger.error(f"Ошибка получения счетчика {key}: {e}")
+            return 0
+    
     def get_keys_pattern(self, pattern: str) -> list:
         """
         Получение ключей по шаблону
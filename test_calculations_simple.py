@@ -35,7 +35,10 @@ def test_calculations():
             calculate_channel_efficiency_score,
             calculate_market_share,
             calculate_customer_acquisition_funnel,
-            calculate_seasonal_coefficient
+            calculate_seasonal_coefficient,
+            calculate_channel_rating_batch,
+            determine_segment_code,
+            SEGMENT_NAMES
         )
         print("✅ Все функции из calculations.py импортированы")
         
@@ -110,6 +113,19 @@ def test_calculations():
         print(f"13. Сезонные коэффициенты: декабрь={winter_coeff}, июль={summer_coeff}")
         assert winter_coeff > summer_coeff, f"Декабрь должен быть активнее июля"
         
+        # Тест 14: Пакетный рейтинг совпадает со скалярным (ядро Numba или Python)
+        ratings = calculate_channel_rating_batch([1.4, -0.5, 0.0], [0.25, 0.05, 0.0], [2000, 30000, 0])
+        expected = [calculate_channel_rating(1.4, 0.25, 2000),
+                    calculate_channel_rating(-0.5, 0.05, 30000),
+                    calculate_channel_rating(0.0, 0.0, 0)]
+        print(f"14. Пакетный рейтинг каналов: {[round(float(r), 2) for r in ratings]}")
+        assert all(abs(r - e) < 1e-9 for r, e in zip(ratings, expected)), f"Расхождение: {ratings} vs {expected}"
+        
+        # Тест 15: Код сегмента соответствует названию
+        code = determine_segment_code(4, 20000, [4500, 5500, 4800, 6200])
+        print(f"15. Код сегмента: {code} ({SEGMENT_NAMES[code]})")
+        assert SEGMENT_NAMES[code] == segment, f"Ожидался сегмент {segment}, получен {SEGMENT_NAMES[code]}"
+        
         print("\n🎉 Все тесты пройдены успешно!")
         print("✅ Модуль calculations.py работает корректно")
         return True
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Тест форматтеров: пакетные версии должны совпадать со скалярными
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from utils.formatters import format_duration, format_duration_batch
+
+def test_format_duration_batch():
+    """format_duration_batch совпадает с format_duration поэлементно"""
+    samples = [-3700, -61, -5, 0, 5, 59, 60, 61, 150, 3599, 3600, 3660, 7265, 86400]
+    
+    batch = format_duration_batch(np.array(samples))
+    expected = [format_duration(s) for s in samples]
+    
+    assert batch == expected, f"Ожидалось {expected}, получено {batch}"
+    print(f"✅ format_duration_batch совпадает с format_duration на {len(samples)} значениях")
+
+if __name__ == "__main__":
+    test_format_duration_batch()
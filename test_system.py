@@ -4,9 +4,48 @@
 """
 
 import asyncio
+import importlib
 import sys
 import traceback
 from datetime import datetime
+from types import MappingProxyType
+
+# (название, модуль, проверяемые имена, вызываемые без аргументов имена, сообщение об успехе, об ошибке)
+IMPORT_PROBES = [
+    ("Analytics Service", "services.analytics", ("AnalyticsService",), ("AnalyticsService",),
+     "импорт успешен", "ошибка импорта"),
+    ("Visualization Service", "services.visualization", ("get_visualization_service",),
+     ("get_visualization_service",), "импорт успешен", "ошибка импорта"),
+    ("Rate Limiter", "utils.rate_limiter", ("RateLimiter", "rate_limit", "admin_rate_limit"), ("RateLimiter",),
+     "импорт успешен", "ошибка импорта"),
+    ("Error Handler", "utils.error_handler", ("get_error_handler", "ErrorMetrics"),
+     ("get_error_handler", "ErrorMetrics"), "импорт успешен", "ошибка импорта"),
+    ("Database Service", "services.database", ("DatabaseService",), (), "импорт успешен", "ошибка импорта"),
+    ("Конфигурация", "config", ("USE_POSTGRES", "REDIS_URL", "EMOJI"), (), "загружена успешно", "ошибка загрузки"),
+    ("Новые команды бота", "handlers.commands",
+     ("channels_chart_command", "segments_chart_command", "forecast_command",
+      "compare_channels_command", "status_command"), (), "импорт успешен", "ошибка импорта"),
+]
+
+def _probe(module_name, names, init=()):
+    """Импорт модуля, проверка наличия имён и создание объектов"""
+    # import_module сам отдает уже загруженный модуль из sys.modules, а импорт,
+    # идущий в соседнем потоке, дожидается под блокировкой модуля
+    module = importlib.import_module(module_name)
+    missing = [name for name in names if not hasattr(module, name)]
+    if missing:
+        raise ImportError(f"cannot import name(s) {', '.join(missing)} from '{module_name}'")
+    for name in init:
+        getattr(module, name)()
+    return module
+
+def _probe_calculations():
+    calculations = _probe("utils.calculations", ("calculate_seasonal_coefficient", "calculate_cac",
+                                                 "calculate_ltv", "calculate_roi"))
+    # Тест расчёта сезонного коэффициента для караоке
+    coeff_dec = calculations.calculate_seasonal_coefficient(12)  # Декабрь
+    coeff_jul = calculations.calculate_seasonal_coefficient(7)   # Июль
+    return coeff_dec, coeff_jul
 
 async def test_system():
     """Комплексное тестирование обновлённой системы"""
@@ -15,90 +54,31 @@ async def test_system():
     print("=" * 50)
     
     tests_passed = 0
-    tests_total = 0
-    
-    # Тест 1: Импорт Analytics Service
-    tests_total += 1
-    try:
-        from services.analytics import AnalyticsService
-        analytics = AnalyticsService()
-        print("✅ Analytics Service - импорт успешен")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Analytics Service - ошибка импорта: {e}")
-    
-    # Тест 2: Импорт Visualization Service  
-    tests_total += 1
-    try:
-        from services.visualization import get_visualization_service
-        vis = get_visualization_service()
-        print("✅ Visualization Service - импорт успешен")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Visualization Service - ошибка импорта: {e}")
-    
-    # Тест 3: Rate Limiter
-    tests_total += 1
-    try:
-        from utils.rate_limiter import RateLimiter, rate_limit, admin_rate_limit
-        limiter = RateLimiter()
-        print("✅ Rate Limiter - импорт успешен")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Rate Limiter - ошибка импорта: {e}")
-    
-    # Тест 4: Error Handler
-    tests_total += 1
-    try:
-        from utils.error_handler import get_error_handler, ErrorMetrics
-        handler = get_error_handler()
-        metrics = ErrorMetrics()
-        print("✅ Error Handler - импорт успешен")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Error Handler - ошибка импорта: {e}")
-    
-    # Тест 5: Database Service
-    tests_total += 1
-    try:
-        from services.database import DatabaseService
-        print("✅ Database Service - импорт успешен")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Database Service - ошибка импорта: {e}")
+    tests_total = len(IMPORT_PROBES) + 1
     
-    # Тест 6: Конфигурация
-    tests_total += 1
-    try:
-        from config import USE_POSTGRES, REDIS_URL, EMOJI
-        print("✅ Конфигурация - загружена успешно")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Конфигурация - ошибка загрузки: {e}")
+    # Независимые проверки импорта выполняются параллельно в потоках:
+    # общее время определяется самым тяжёлым импортом, а не их суммой
+    results = await asyncio.gather(
+        *(asyncio.to_thread(_probe, module_name, names, init)
+          for _, module_name, names, init, _, _ in IMPORT_PROBES),
+        asyncio.to_thread(_probe_calculations),
+        return_exceptions=True
+    )
     
-    # Тест 7: Команды бота
-    tests_total += 1
-    try:
-        from handlers.commands import (
-            channels_chart_command, segments_chart_command,
-            forecast_command, compare_channels_command, status_command
-        )
-        print("✅ Новые команды бота - импорт успешен")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Новые команды бота - ошибка импорта: {e}")
+    # Тесты 1-7: импорт модулей
+    for (label, _, _, _, ok_text, fail_text), result in zip(IMPORT_PROBES, results):
+        if isinstance(result, BaseException):
+            print(f"❌ {label} - {fail_text}: {result}")
+        else:
+            print(f"✅ {label} - {ok_text}")
+            tests_passed += 1
     
     # Тест 8: Расчётные функции
-    tests_total += 1
-    try:
-        from utils.calculations import (
-            calculate_seasonal_coefficient, calculate_cac,
-            calculate_ltv, calculate_roi
-        )
-        # Тест расчёта сезонного коэффициента для караоке
-        coeff_dec = calculate_seasonal_coefficient(12)  # Декабрь
-        coeff_jul = calculate_seasonal_coefficient(7)   # Июль
-        
+    result = results[-1]
+    if isinstance(result, BaseException):
+        print(f"❌ Расчётные функции - ошибка: {result}")
+    else:
+        coeff_dec, coeff_jul = result
         if coeff_dec > 1.3 and coeff_jul < 1.0:  # Проверяем логику караоке-бара
             print("✅ Расчётные функции - работают корректно")
             print(f"   Коэффициент декабря: {coeff_dec:.2f}")
@@ -106,8 +86,6 @@ async def test_system():
             tests_passed += 1
         else:
             print("⚠️ Расчётные функции - возможные проблемы с коэффициентами")
-    except Exception as e:
-        print(f"❌ Расчётные функции - ошибка: {e}")
     
     print("\n" + "=" * 50)
     print(f"📊 РЕЗУЛЬТАТЫ ТЕСТИРОВАНИЯ:")
@@ -121,6 +99,24 @@ async def test_system():
         print("⚠️ Некоторые тесты не пройдены. Требуется диагностика.")
         return False
 
+# Тестовые данные для каналов (неизменяемые, создаются один раз при импорте)
+TEST_CHANNELS = (
+    MappingProxyType({
+        'name': 'Instagram',
+        'revenue': 150000,
+        'roi': 0.35,
+        'conversion_rate': 0.08,
+        'cac': 2500
+    }),
+    MappingProxyType({
+        'name': 'ВКонтакте',
+        'revenue': 120000,
+        'roi': 0.28,
+        'conversion_rate': 0.06,
+        'cac': 3000
+    }),
+)
+
 def test_visualization():
     """Тест создания тестовых графиков"""
     print("\n🎨 ТЕСТ ВИЗУАЛИЗАЦИИ:")
@@ -129,28 +125,10 @@ def test_visualization():
         
         vis = get_visualization_service()
         
-        # Тестовые данные для каналов
-        test_channels = [
-            {
-                'name': 'Instagram',
-                'revenue': 150000,
-                'roi': 0.35,
-                'conversion_rate': 0.08,
-                'cac': 2500
-            },
-            {
-                'name': 'ВКонтакте', 
-                'revenue': 120000,
-                'roi': 0.28,
-                'conversion_rate': 0.06,
-                'cac': 3000
-            }
-        ]
-        
         # Попытка создания графика
-        chart_buffer = vis.create_channel_performance_chart(test_channels)
+        chart_buffer = vis.create_channel_performance_chart(TEST_CHANNELS)
         
-        if chart_buffer and len(chart_buffer.getvalue()) > 1000:
+        if chart_buffer and chart_buffer.getbuffer().nbytes > 1000:
             print("✅ Графики создаются успешно")
             return True
         else:
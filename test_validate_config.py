@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Тест валидатора конфигурации validate_config.py
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from validate_config import validate_ids, validate_json_credentials
+
+def test_array_credentials_file():
+    """JSON-массив вместо объекта в файле ключа дает сообщение об отсутствующих полях, а не исключение"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        credentials_file = os.path.join(tmp_dir, 'credentials.json')
+        with open(credentials_file, 'w') as f:
+            json.dump([{'type': 'service_account'}], f)
+        
+        is_valid, message = validate_json_credentials({'GOOGLE_CREDENTIALS_FILE': credentials_file})
+    
+    assert not is_valid
+    assert message.endswith("отсутствуют поля: type, project_id, private_key, client_email"), message
+    print(f"✅ Массив в файле ключа: {message}")
+
+def test_validate_ids_matches_int():
+    """validate_ids принимает те же списки ID, что и разбор через int()"""
+    cases = {
+        "1, 2,-3": (True, 3),
+        "1_000,-2": (True, 2),
+        ",,": (True, 0),
+        "1,x": (False, None),
+        "1 2": (False, None),
+        "1__0": (False, None),
+    }
+    for ids_str, (expected_valid, expected_count) in cases.items():
+        is_valid, message = validate_ids({'ADMIN_IDS': ids_str}, 'ADMIN_IDS', 'Admin IDs')
+        assert is_valid == expected_valid, f"{ids_str!r}: {message}"
+        if expected_valid:
+            assert f"найдено {expected_count} ID" in message, f"{ids_str!r}: {message}"
+    print(f"✅ validate_ids: {len(cases)} списков ID проверено")
+
+if __name__ == "__main__":
+    test_array_credentials_file()
+    test_validate_ids_matches_int()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Тест графиков utils/visualizers.py на граничных входных данных
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.visualizers import create_conversion_funnel, create_trend_chart
+
+def test_empty_funnel():
+    """Пустая воронка рисуется как пустой график"""
+    image = create_conversion_funnel({})
+    
+    assert isinstance(image, bytes) and image.startswith(b'\x89PNG'), "Ожидались PNG-байты"
+    print(f"✅ Пустая воронка: {len(image)} байт")
+
+def test_empty_trend():
+    """Пустой список точек рисуется как пустой график трендов"""
+    image = create_trend_chart([])
+    
+    assert isinstance(image, bytes) and image.startswith(b'\x89PNG'), "Ожидались PNG-байты"
+    print(f"✅ Пустой график трендов: {len(image)} байт")
+
+if __name__ == "__main__":
+    test_empty_funnel()
+    test_empty_trend()
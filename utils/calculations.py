@@ -2,9 +2,74 @@
 Функции для расчета маркетинговых метрик
 """
 
-from typing import Union, List
+import functools
+import numpy as np
+from typing import Union, List, Optional, Tuple
 from config import SEGMENT_CONFIG, LTV_CONFIG, CHANNEL_COSTS
 
+def _compile(signature: str):
+    """
+    Ленивая компиляция ядра расчета через Numba с типизированной сигнатурой
+    
+    Numba импортируется и ядро компилируется при первом вызове, а не при импорте
+    модуля, поэтому модули, не вызывающие ядра, не платят за загрузку Numba.
+    После первого вызова имя ядра в модуле указывает прямо на скомпилированную
+    функцию, без промежуточной обертки; cache=True сохраняет машинный код
+    в __pycache__. Без Numba (он опционален и не входит в requirements.txt)
+    ядро остается обычной Python-функцией.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def first_call(*args):
+            try:
+                from numba import njit
+                compiled = njit(signature, cache=True)(func)
+            except ImportError:
+                compiled = func
+            func.__globals__[func.__name__] = compiled
+            return compiled(*args)
+        return first_call
+    return decorator
+
+# Коды сегментов клиентов (индексы в SEGMENT_NAMES)
+SEGMENT_VIP = 0
+SEGMENT_REGULAR = 1
+SEGMENT_ACTIVE = 2
+SEGMENT_NEW = 3
+SEGMENT_POTENTIAL = 4
+
+# Названия сегментов для отображения
+SEGMENT_NAMES = ('VIP', 'Постоянный', 'Активный', 'Новый', 'Потенциальный')
+
+# Веса ROI, конверсии и CAC в рейтинге канала
+_RATING_WEIGHTS = np.array([0.5, 0.3, 0.2])
+
+# Поля пакетного расчета воронки
+_FUNNEL_DTYPE = np.dtype([
+    ('ctr', 'f8'),
+    ('lead_conversion', 'f8'),
+    ('client_conversion', 'f8'),
+    ('overall_conversion', 'f8')
+])
+
+# Сезонность для караоке-рюмочной (коэффициенты для развлекательного заведения)
+_SEASONAL_COEFFICIENTS = {
+    1: 1.0,   # Январь - пост-праздничный, но активный
+    2: 1.1,   # Февраль - День Святого Валентина, 23 февраля
+    3: 1.1,   # Март - 8 марта, увеличение активности
+    4: 1.2,   # Апрель - увеличение активности к лету
+    5: 1.2,   # Май - майские праздники, корпоративы
+    6: 0.9,   # Июнь - начало сезона отпусков
+    7: 0.9,   # Июль - сезон отпусков, спад
+    8: 0.9,   # Август - пик отпусков, минимальная активность
+    9: 1.15,  # Сентябрь - возвращение в город, начало сезона
+    10: 1.15, # Октябрь - стабильно высокая активность
+    11: 1.2,  # Ноябрь - подготовка к праздникам, корпоративы
+    12: 1.5   # Декабрь - корпоративы, предновогодний ажиотаж
+}
+_SEASONAL_MONTHS = np.array(list(_SEASONAL_COEFFICIENTS.keys()), dtype=float)
+_SEASONAL_VALUES = np.array(list(_SEASONAL_COEFFICIENTS.values()))
+
 def calculate_cac(channel_cost: float, clients_count: int) -> float:
     """
     Расчет CAC (Customer Acquisition Cost) - стоимость привлечения клиента
@@ -47,7 +112,8 @@ def calculate_ltv(avg_check: float, visits_count: int, visit_amounts: List[float
     return avg_check * max_visits
 
 
-def determine_client_segment(visits_count: int, total_revenue: float, visit_amounts: List[float] = None) -> str:
+def determine_client_segment(visits_count: int, total_revenue: float, visit_amounts: List[float] = None,
+                             recent_stats: Optional[Tuple[float, int]] = None) -> str:
     """
     Определение сегмента клиента на основе его активности и дохода
     
@@ -55,45 +121,74 @@ def determine_client_segment(visits_count: int, total_revenue: float, visit_amou
         visits_count: Количество визитов
         total_revenue: Общий доход от клиента
         visit_amounts: Список сумм по каждому визиту (опционально)
+        recent_stats: Предрасчитанные (сумма, количество) последних 3 визитов (опционально)
     
     Returns:
         Сегмент клиента
     """
+    return SEGMENT_NAMES[determine_segment_code(visits_count, total_revenue, visit_amounts, recent_stats)]
+
+def determine_segment_code(visits_count: int, total_revenue: float, visit_amounts: List[float] = None,
+                           recent_stats: Optional[Tuple[float, int]] = None) -> int:
+    """
+    Определение кода сегмента клиента (индекс в SEGMENT_NAMES)
+    
+    Args:
+        visits_count: Количество визитов
+        total_revenue: Общий доход от клиента
+        visit_amounts: Список сумм по каждому визиту (опционально)
+        recent_stats: Предрасчитанные (сумма, количество) последних 3 визитов (опционально)
+    
+    Returns:
+        Код сегмента (SEGMENT_VIP, SEGMENT_REGULAR, ...)
+    """
     if visits_count == 0:
-        return "Потенциальный"
+        return SEGMENT_POTENTIAL
     
     # Используем суммы визитов для более точного анализа
-    if visit_amounts:
-        # Анализируем активность клиента
-        recent_visits = visit_amounts[:3]  # Последние 3 визита
-        avg_recent_check = sum(recent_visits) / len(recent_visits) if recent_visits else 0
-        
-        # VIP клиенты (высокий средний чек или много визитов)
-        if avg_recent_check > 8000 or visits_count >= 5:
-            return "VIP"
-        
-        # Постоянные клиенты (регулярные визиты)
-        if visits_count >= 3 and avg_recent_check > 3000:
-            return "Постоянный"
-        
-        # Активные клиенты (несколько визитов)
-        if visits_count >= 2:
-            return "Активный"
-        
-        # Новые клиенты
-        return "Новый"
-    
-    # Fallback на старую логику если нет детализации по визитам
-    avg_check = total_revenue / visits_count if visits_count > 0 else 0
-    
-    if visits_count >= 5 or avg_check > 8000:
-        return "VIP"
-    elif visits_count >= 3 and avg_check > 3000:
-        return "Постоянный"
-    elif visits_count >= 2:
-        return "Активный"
+    if visit_amounts or recent_stats:
+        # Анализируем активность клиента по последним 3 визитам без среза списка
+        if recent_stats is not None:
+            recent_sum, recent_count = recent_stats
+            avg_check = recent_sum / recent_count if recent_count else 0
+        elif len(visit_amounts) >= 3:
+            avg_check = (visit_amounts[0] + visit_amounts[1] + visit_amounts[2]) / 3
+        elif len(visit_amounts) == 2:
+            avg_check = (visit_amounts[0] + visit_amounts[1]) / 2
+        else:
+            avg_check = visit_amounts[0]
     else:
-        return "Новый"
+        # Fallback на старую логику если нет детализации по визитам
+        avg_check = total_revenue / visits_count if visits_count > 0 else 0
+    
+    # Пороговые правила - обычный Python: пара сравнений дешевле вызова JIT-функции
+    # VIP клиенты (высокий средний чек или много визитов)
+    if avg_check > 8000 or visits_count >= 5:
+        return SEGMENT_VIP
+    
+    # Постоянные клиенты (регулярные визиты)
+    if visits_count >= 3 and avg_check > 3000:
+        return SEGMENT_REGULAR
+    
+    # Активные клиенты (несколько визитов)
+    if visits_count >= 2:
+        return SEGMENT_ACTIVE
+    
+    # Новые клиенты
+    return SEGMENT_NEW
+
+def count_segments(segment_codes: np.ndarray) -> dict:
+    """
+    Подсчет клиентов по сегментам
+    
+    Args:
+        segment_codes: Массив кодов сегментов
+    
+    Returns:
+        Словарь {название сегмента: количество клиентов}
+    """
+    counts = np.bincount(np.asarray(segment_codes, dtype=np.int64), minlength=len(SEGMENT_NAMES))
+    return dict(zip(SEGMENT_NAMES, counts.tolist()))
 
 def calculate_roi(revenue: float, cost: float) -> float:
     """
@@ -140,34 +235,41 @@ def calculate_channel_rating(roi: float, conversion: float, cac: float) -> float
     Returns:
         Рейтинг от 1.0 до 5.0
     """
-    # Весовые коэффициенты для метрик
-    roi_weight = 0.5
-    conversion_weight = 0.3
-    cac_weight = 0.2
-    
-    # Нормализация ROI (от -100% до 200%)
-    roi_score = max(0, min(5, (roi + 1) * 2.5))  # ROI 0% = 2.5, ROI 100% = 5.0
+    return _rating_core(float(roi), float(conversion), float(cac))
+
+@_compile('float64(float64, float64, float64)')
+def _rating_core(roi, conversion, cac):
+    # Нормализация ROI (ROI 0% = 2.5, ROI 100% = 5.0)
+    roi_score = min(5.0, max(0.0, (roi + 1) * 2.5))
     
-    # Нормализация конверсии (от 0% до 50%)
-    conversion_score = max(0, min(5, conversion * 10))  # 50% конверсия = 5.0
+    # Нормализация конверсии (50% конверсия = 5.0)
+    conversion_score = min(5.0, max(0.0, conversion * 10))
     
     # Нормализация CAC (инвертированная - чем меньше, тем лучше)
-    # Предполагаем, что CAC до 10000 руб - отлично, свыше 50000 - плохо
-    if cac == 0:
-        cac_score = 5.0
-    elif cac <= 10000:
-        cac_score = 5.0
-    elif cac >= 50000:
-        cac_score = 1.0
-    else:
-        cac_score = 5.0 - ((cac - 10000) / 40000) * 4  # Линейная шкала
+    # CAC до 10000 руб - отлично, от 50000 - плохо, между ними линейная шкала
+    cac_score = 5.0 if cac <= 10000 else max(1.0, 5.0 - (cac - 10000) * 1e-4)
+    
+    # Итоговый рейтинг с весами 0.5 / 0.3 / 0.2
+    return min(5.0, max(1.0, 0.5 * roi_score + 0.3 * conversion_score + 0.2 * cac_score))
+
+def calculate_channel_rating_batch(roi: np.ndarray, conversion: np.ndarray, cac: np.ndarray) -> np.ndarray:
+    """
+    Векторизованный расчет рейтинга для набора каналов
+    
+    Args:
+        roi: Массив ROI каналов
+        conversion: Массив конверсий каналов
+        cac: Массив CAC каналов в рублях
     
-    # Итоговый рейтинг
-    rating = (roi_score * roi_weight + 
-              conversion_score * conversion_weight + 
-              cac_score * cac_weight)
+    Returns:
+        Массив рейтингов от 1.0 до 5.0
+    """
+    roi_score = np.clip((np.asarray(roi, dtype=float) + 1) * 2.5, 0.0, 5.0)
+    conversion_score = np.clip(np.asarray(conversion, dtype=float) * 10, 0.0, 5.0)
+    cac_score = np.clip((50000 - np.asarray(cac, dtype=float)) / 40000, 0.0, 1.0) * 4 + 1
     
-    return max(1.0, min(5.0, rating))
+    scores = np.stack((roi_score, conversion_score, cac_score), axis=-1)
+    return np.clip(scores @ _RATING_WEIGHTS, 1.0, 5.0)
 
 def calculate_payback_period(cac: float, avg_check: float) -> float:
     """
@@ -213,16 +315,15 @@ def calculate_customer_lifetime_months(first_visit_date: str, last_visit_date: s
         Количество месяцев между визитами
     """
     try:
-        from datetime import datetime
-        
-        first_date = datetime.strptime(first_visit_date, '%Y-%m-%d')
-        last_date = datetime.strptime(last_visit_date, '%Y-%m-%d')
+        # Формат фиксированной ширины YYYY-MM-DD: год и месяц берём срезами без strptime
+        first_year, first_month = int(first_visit_date[:4]), int(first_visit_date[5:7])
+        last_year, last_month = int(last_visit_date[:4]), int(last_visit_date[5:7])
         
         # Разница в месяцах
-        months_diff = (last_date.year - first_date.year) * 12 + (last_date.month - first_date.month)
+        months_diff = (last_year - first_year) * 12 + (last_month - first_month)
         return max(1, months_diff)  # Минимум 1 месяц
         
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, IndexError):
         return 1
 
 def calculate_channel_efficiency_score(channel_data: dict) -> float:
@@ -235,24 +336,28 @@ def calculate_channel_efficiency_score(channel_data: dict) -> float:
     Returns:
         Индекс эффективности от 0 до 100
     """
-    roi = channel_data.get('roi', 0)
-    conversion = channel_data.get('conversion', 0)
-    cac = channel_data.get('cac', 0)
-    ltv = channel_data.get('ltv', 0)
-    
+    return _efficiency_core(
+        float(channel_data.get('roi', 0)),
+        float(channel_data.get('conversion', 0)),
+        float(channel_data.get('cac', 0)),
+        float(channel_data.get('ltv', 0))
+    )
+
+@_compile('float64(float64, float64, float64, float64)')
+def _efficiency_core(roi, conversion, cac, ltv):
     # Компоненты индекса
-    roi_component = max(0, min(40, (roi + 1) * 20))  # Максимум 40 баллов
-    conversion_component = max(0, min(30, conversion * 60))  # Максимум 30 баллов
+    roi_component = max(0.0, min(40.0, (roi + 1) * 20))  # Максимум 40 баллов
+    conversion_component = max(0.0, min(30.0, conversion * 60))  # Максимум 30 баллов
     
     # CAC/LTV соотношение (чем больше LTV к CAC, тем лучше)
     if cac > 0 and ltv > 0:
         ltv_cac_ratio = ltv / cac
-        ltv_component = max(0, min(30, ltv_cac_ratio * 10))  # Максимум 30 баллов
+        ltv_component = max(0.0, min(30.0, ltv_cac_ratio * 10))  # Максимум 30 баллов
     else:
-        ltv_component = 0
+        ltv_component = 0.0
     
     efficiency_score = roi_component + conversion_component + ltv_component
-    return min(100, efficiency_score)
+    return min(100.0, efficiency_score)
 
 def calculate_market_share(channel_revenue: float, total_revenue: float) -> float:
     """
@@ -300,6 +405,34 @@ def calculate_customer_acquisition_funnel(impressions: int, clicks: int,
         'clients': clients
     }
 
+def calculate_customer_acquisition_funnel_batch(impressions: np.ndarray, clicks: np.ndarray,
+                                               leads: np.ndarray, clients: np.ndarray) -> np.ndarray:
+    """
+    Расчет воронки привлечения сразу для набора каналов
+    
+    Args:
+        impressions: Массив показов
+        clicks: Массив кликов
+        leads: Массив лидов
+        clients: Массив клиентов
+    
+    Returns:
+        Структурированный массив с полями ctr, lead_conversion,
+        client_conversion, overall_conversion (0 при нулевом знаменателе)
+    """
+    impressions = np.asarray(impressions, dtype=float)
+    clicks = np.asarray(clicks, dtype=float)
+    leads = np.asarray(leads, dtype=float)
+    clients = np.asarray(clients, dtype=float)
+    
+    funnel = np.zeros(len(impressions), dtype=_FUNNEL_DTYPE)
+    np.divide(clicks, impressions, out=funnel['ctr'], where=impressions > 0)
+    np.divide(leads, clicks, out=funnel['lead_conversion'], where=clicks > 0)
+    np.divide(clients, leads, out=funnel['client_conversion'], where=leads > 0)
+    np.divide(clients, impressions, out=funnel['overall_conversion'], where=impressions > 0)
+    
+    return funnel
+
 def calculate_seasonal_coefficient(month: int) -> float:
     """
     Расчет сезонного коэффициента для караоке-рюмочной "Евгенич"
@@ -310,20 +443,21 @@ def calculate_seasonal_coefficient(month: int) -> float:
     Returns:
         Сезонный коэффициент (1.0 = средний уровень)
     """
-    # Сезонность для караоке-рюмочной (коэффициенты для развлекательного заведения)
-    seasonal_coefficients = {
-        1: 1.0,   # Январь - пост-праздничный, но активный
-        2: 1.1,   # Февраль - День Святого Валентина, 23 февраля
-        3: 1.1,   # Март - 8 марта, увеличение активности
-        4: 1.2,   # Апрель - увеличение активности к лету
-        5: 1.2,   # Май - майские праздники, корпоративы
-        6: 0.9,   # Июнь - начало сезона отпусков
-        7: 0.9,   # Июль - сезон отпусков, спад
-        8: 0.9,   # Август - пик отпусков, минимальная активность
-        9: 1.15,  # Сентябрь - возвращение в город, начало сезона
-        10: 1.15, # Октябрь - стабильно высокая активность
-        11: 1.2,  # Ноябрь - подготовка к праздникам, корпоративы
-        12: 1.5   # Декабрь - корпоративы, предновогодний ажиотаж
-    }
+    return _SEASONAL_COEFFICIENTS.get(month, 1.0)
+
+def calculate_seasonal_coefficient_smooth(month: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """
+    Сезонный коэффициент для дробного номера месяца
     
-    return seasonal_coefficients.get(month, 1.0)
+    Значения в целых месяцах совпадают с calculate_seasonal_coefficient,
+    между ними коэффициент интерполируется линейно с переходом декабрь → январь.
+    
+    Args:
+        month: Дробный номер месяца (например, 3.5 - середина между мартом и апрелем)
+               или массив таких значений
+    
+    Returns:
+        Сезонный коэффициент (или массив коэффициентов)
+    """
+    coefficients = np.interp(month, _SEASONAL_MONTHS, _SEASONAL_VALUES, period=12)
+    return float(coefficients) if np.ndim(coefficients) == 0 else coefficients
@@ -2,22 +2,59 @@
 Система обработки ошибок и логирования
 """
 
+from __future__ import annotations
+
+import importlib
 import logging
-import traceback
-from typing import Dict, Any, Optional
+import time
+from collections import Counter, deque
+from typing import Dict, Any, Optional, TYPE_CHECKING
 from datetime import datetime
-from telegram import Update
-from telegram.ext import ContextTypes
+from functools import cache
+
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import ContextTypes
 
 logger = logging.getLogger(__name__)
 
+# Типы telegram нужны только в аннотациях, поэтому python-telegram-bot
+# загружается лишь при явном обращении к utils.error_handler.Update/ContextTypes
+_LAZY_TELEGRAM_NAMES = {
+    'Update': 'telegram',
+    'ContextTypes': 'telegram.ext',
+}
+
+def __getattr__(name: str) -> Any:
+    """Ленивый импорт типов telegram (PEP 562)"""
+    module_name = _LAZY_TELEGRAM_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+# Сообщения пользователю по типу ошибки
+_DEFAULT_ERROR_MESSAGE = "❌ Произошла ошибка. Администратор уведомлён."
+_ERROR_MESSAGES = {}
+for _names, _message in (
+    (('NetworkError', 'TimedOut', 'RetryAfter'), "🌐 Временные проблемы с сетью. Попробуйте позже."),
+    (('BadRequest', 'Unauthorized'), "❌ Неверный запрос. Проверьте команду и попробуйте снова."),
+    (('RateLimitError', 'FloodWait'), "⏰ Слишком много запросов. Подождите немного."),
+    (('DatabaseError', 'ConnectionError'), "🔧 Технические работы. Попробуйте позже."),
+):
+    _ERROR_MESSAGES.update(dict.fromkeys(_names, _message))
+del _names, _message
+
 class ErrorHandler:
     """Централизованная система обработки ошибок"""
     
     def __init__(self):
-        self.error_counts = {}
-        self.last_errors = []
+        self.error_counts = Counter()
+        self.total_errors = 0
         self.max_last_errors = 50
+        # Кольцевой буфер: старые записи вытесняются автоматически за O(1)
+        self.last_errors = deque(maxlen=self.max_last_errors)
     
     async def handle_error(self, update: Optional[Update], context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -28,87 +65,91 @@ class ErrorHandler:
             context: Контекст выполнения
         """
         try:
-            # Получаем информацию об ошибке
             error = context.error
-            error_type = type(error).__name__
-            error_message = str(error)
-            
-            # Увеличиваем счётчик ошибок
-            self.error_counts[error_type] = self.error_counts.get(error_type, 0) + 1
-            
-            # Записываем в список последних ошибок
-            error_info = {
-                'timestamp': datetime.now().isoformat(),
-                'type': error_type,
-                'message': error_message,
-                'user_id': update.effective_user.id if update and update.effective_user else None,
-                'chat_id': update.effective_chat.id if update and update.effective_chat else None,
-                'update_type': update.update_id if update else None
-            }
-            
-            self.last_errors.append(error_info)
-            if len(self.last_errors) > self.max_last_errors:
-                self.last_errors.pop(0)
-            
-            # Логируем ошибку
-            logger.error(
-                f"Error '{error_type}': {error_message}\n"
-                f"User: {error_info.get('user_id', 'Unknown')}\n"
-                f"Chat: {error_info.get('chat_id', 'Unknown')}\n"
-                f"Traceback: {traceback.format_exc()}"
-            )
+            self.record(error, update)
             
             # Отправляем сообщение пользователю (если это не критическая ошибка)
             if update and update.effective_message:
-                await self._send_user_error_message(update, error_type)
+                await self._send_user_error_message(update, type(error).__name__)
             
         except Exception as e:
-            logger.critical(f"Ошибка в обработчике ошибок: {e}")
+            logger.critical("Ошибка в обработчике ошибок: %s", e)
+    
+    def record(self, error: BaseException, update: Optional[Update] = None, source: Optional[str] = None) -> None:
+        """
+        Учёт ошибки в статистике и журнале без ответа пользователю
+        
+        Args:
+            error: Исключение
+            update: Telegram Update объект, в котором возникла ошибка
+            source: Где возникла ошибка (например, имя команды)
+        """
+        # Получаем информацию об ошибке
+        error_type = type(error).__name__
+        error_message = str(error)
+        
+        # Увеличиваем счётчик ошибок
+        self.error_counts[error_type] += 1
+        self.total_errors += 1
+        
+        # Записываем в список последних ошибок
+        error_info = {
+            'timestamp': datetime.now().isoformat(),
+            'type': error_type,
+            'message': error_message,
+            'user_id': update.effective_user.id if update and update.effective_user else None,
+            'chat_id': update.effective_chat.id if update and update.effective_chat else None,
+            'update_type': update.update_id if update else None
+        }
+        
+        self.last_errors.append(error_info)
+        
+        # Трассировка стека не нужна только для известных штатных ошибок (сеть, ввод пользователя, лимиты);
+        # в режиме отладки она пишется всегда. Форматирует её сам logging и только если запись выводится
+        with_traceback = (ErrorFilters.classify(error) not in _BENIGN_CATEGORIES
+                          or logger.isEnabledFor(logging.DEBUG))
+        exc_info = error if with_traceback else None
+        
+        # Логируем ошибку
+        if source is None:
+            logger.error("Error %r: %s | user=%s chat=%s", error_type, error_message,
+                         error_info['user_id'], error_info['chat_id'], exc_info=exc_info)
+        else:
+            logger.error("Error %r in %s: %s | user=%s chat=%s", error_type, source, error_message,
+                         error_info['user_id'], error_info['chat_id'], exc_info=exc_info)
     
     async def _send_user_error_message(self, update: Update, error_type: str) -> None:
         """Отправка сообщения об ошибке пользователю"""
         try:
             # Определяем тип сообщения на основе типа ошибки
-            if error_type in ['NetworkError', 'TimedOut', 'RetryAfter']:
-                message = "🌐 Временные проблемы с сетью. Попробуйте позже."
-            elif error_type in ['BadRequest', 'Unauthorized']:
-                message = "❌ Неверный запрос. Проверьте команду и попробуйте снова."
-            elif error_type in ['RateLimitError', 'FloodWait']:
-                message = "⏰ Слишком много запросов. Подождите немного."
-            elif error_type in ['DatabaseError', 'ConnectionError']:
-                message = "🔧 Технические работы. Попробуйте позже."
-            else:
-                message = "❌ Произошла ошибка. Администратор уведомлён."
+            message = _ERROR_MESSAGES.get(error_type, _DEFAULT_ERROR_MESSAGE)
             
             await update.effective_message.reply_text(message)
             
         except Exception as e:
-            logger.error(f"Не удалось отправить сообщение об ошибке: {e}")
+            logger.error("Не удалось отправить сообщение об ошибке: %s", e)
     
     def get_error_stats(self) -> Dict[str, Any]:
         """Получение статистики ошибок"""
         return {
             'error_counts': self.error_counts,
-            'total_errors': sum(self.error_counts.values()),
+            'total_errors': self.total_errors,
             'unique_error_types': len(self.error_counts),
-            'last_errors': self.last_errors[-10:],  # Последние 10 ошибок
-            'most_common_error': max(self.error_counts.items(), key=lambda x: x[1]) if self.error_counts else None
+            'last_errors': list(self.last_errors)[-10:],  # Последние 10 ошибок
+            'most_common_error': self.error_counts.most_common(1)[0] if self.error_counts else None
         }
     
     def clear_error_stats(self) -> None:
         """Очистка статистики ошибок"""
         self.error_counts.clear()
+        self.total_errors = 0
         self.last_errors.clear()
 
 # Глобальный экземпляр обработчика ошибок
-_error_handler = None
-
+@cache
 def get_error_handler() -> ErrorHandler:
-    """Получение экземпляра обработчика ошибок"""
-    global _error_handler
-    if _error_handler is None:
-        _error_handler = ErrorHandler()
-    return _error_handler
+    """Получение экземпляра обработчика ошибок (создаётся при первом вызове)"""
+    return ErrorHandler()
 
 async def error_handler(update: Optional[Update], context: ContextTypes.DEFAULT_TYPE) -> None:
     """Функция-обёртка для обработки ошибок"""
@@ -130,8 +171,6 @@ def handle_exceptions(func):
         try:
             return await func(update, context, *args, **kwargs)
         except Exception as e:
-            logger.error(f"Ошибка в команде {func.__name__}: {e}")
-            
             # Отправляем сообщение об ошибке
             error_message = "❌ Произошла ошибка при выполнении команды. Попробуйте позже."
             
@@ -139,42 +178,61 @@ def handle_exceptions(func):
                 try:
                     await update.effective_message.reply_text(error_message)
                 except Exception as send_error:
-                    logger.error(f"Не удалось отправить сообщение об ошибке: {send_error}")
+                    logger.error("Не удалось отправить сообщение об ошибке: %s", send_error)
             
-            # Логируем ошибку в обработчик
-            handler = get_error_handler()
-            context.error = e
-            await handler.handle_error(update, context)
+            # Учитываем ошибку в статистике и журнале; ответ пользователю уже отправлен выше
+            get_error_handler().record(e, update, source=func.__name__)
     
     return wrapper
 
 # Фильтры для типов ошибок
+_NETWORK_ERRORS = frozenset({'NetworkError', 'TimedOut', 'ConnectionError', 'HTTPError'})
+_USER_ERRORS = frozenset({'BadRequest', 'InvalidFormat', 'ValueError'})
+_RATE_ERRORS = frozenset({'RateLimitError', 'FloodWait', 'RetryAfter'})
+_CRITICAL_ERRORS = frozenset({'DatabaseError', 'AuthenticationError', 'ConfigurationError'})
+
+# Имя типа ошибки -> категория, для классификации одним поиском по словарю
+_ERROR_CATEGORIES = {
+    name: category
+    for category, names in (
+        ('network', _NETWORK_ERRORS),
+        ('user', _USER_ERRORS),
+        ('rate_limit', _RATE_ERRORS),
+        ('critical', _CRITICAL_ERRORS),
+    )
+    for name in names
+}
+
+# Категории штатных ошибок: логируются без трассировки стека
+_BENIGN_CATEGORIES = frozenset({'network', 'user', 'rate_limit'})
+
 class ErrorFilters:
     """Фильтры для различных типов ошибок"""
     
+    @staticmethod
+    def classify(error: Exception) -> Optional[str]:
+        """Категория ошибки: 'network', 'user', 'rate_limit', 'critical' или None"""
+        return _ERROR_CATEGORIES.get(type(error).__name__)
+    
     @staticmethod
     def is_network_error(error: Exception) -> bool:
         """Проверка на сетевую ошибку"""
-        network_errors = ['NetworkError', 'TimedOut', 'ConnectionError', 'HTTPError']
-        return type(error).__name__ in network_errors
+        return type(error).__name__ in _NETWORK_ERRORS
     
     @staticmethod
     def is_user_error(error: Exception) -> bool:
         """Проверка на ошибку пользователя"""
-        user_errors = ['BadRequest', 'InvalidFormat', 'ValueError']
-        return type(error).__name__ in user_errors
+        return type(error).__name__ in _USER_ERRORS
     
     @staticmethod
     def is_rate_limit_error(error: Exception) -> bool:
         """Проверка на ошибку лимита запросов"""
-        rate_errors = ['RateLimitError', 'FloodWait', 'RetryAfter']
-        return type(error).__name__ in rate_errors
+        return type(error).__name__ in _RATE_ERRORS
     
     @staticmethod
     def is_critical_error(error: Exception) -> bool:
         """Проверка на критическую ошибку"""
-        critical_errors = ['DatabaseError', 'AuthenticationError', 'ConfigurationError']
-        return type(error).__name__ in critical_errors
+        return type(error).__name__ in _CRITICAL_ERRORS
 
 # Система метрик
 class ErrorMetrics:
@@ -185,9 +243,9 @@ class ErrorMetrics:
             'total_requests': 0,
             'successful_requests': 0,
             'failed_requests': 0,
-            'error_rate': 0.0,
-            'uptime_start': datetime.now()
+            'uptime_start': datetime.now()  # Для отображения; время работы считается по монотонным часам
         }
+        self._start_mono = time.monotonic()
     
     def record_request(self, success: bool = True) -> None:
         """Записать запрос в метрики"""
@@ -197,18 +255,17 @@ class ErrorMetrics:
             self.metrics['successful_requests'] += 1
         else:
             self.metrics['failed_requests'] += 1
-        
-        # Обновляем процент ошибок
-        if self.metrics['total_requests'] > 0:
-            self.metrics['error_rate'] = (
-                self.metrics['failed_requests'] / self.metrics['total_requests'] * 100
-            )
+    
+    def get_error_rate(self) -> float:
+        """Процент неуспешных запросов"""
+        total = self.metrics['total_requests']
+        return self.metrics['failed_requests'] / total * 100 if total else 0.0
     
     def get_uptime(self) -> str:
         """Получить время работы"""
-        uptime_delta = datetime.now() - self.metrics['uptime_start']
-        days = uptime_delta.days
-        hours, remainder = divmod(uptime_delta.seconds, 3600)
+        elapsed = int(time.monotonic() - self._start_mono)
+        days, remainder = divmod(elapsed, 86400)
+        hours, remainder = divmod(remainder, 3600)
         minutes, _ = divmod(remainder, 60)
         
         return f"{days}д {hours}ч {minutes}м"
@@ -217,6 +274,7 @@ class ErrorMetrics:
         """Получить все метрики"""
         return {
             **self.metrics,
+            'error_rate': self.get_error_rate(),
             'uptime': self.get_uptime()
         }
     
@@ -226,9 +284,9 @@ class ErrorMetrics:
             'total_requests': 0,
             'successful_requests': 0,
             'failed_requests': 0,
-            'error_rate': 0.0,
             'uptime_start': datetime.now()
         })
+        self._start_mono = time.monotonic()
 
 # Глобальные экземпляры
 _metrics = ErrorMetrics()
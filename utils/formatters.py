@@ -3,9 +3,22 @@
 """
 
 import re
-from typing import Union, Optional
+import numpy as np
+from typing import Union, Optional, Tuple, List, Callable
 from datetime import datetime
 
+# Простой шаблон email (используется с fullmatch, поэтому без якорей ^$)
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+# Единицы измерения размера для format_bytes
+_BYTE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# Готовые строки рейтинга для 5 звезд, индекс = int(rating * 2)
+_STAR_TABLE = tuple(
+    "★" * (i // 2) + "☆" * (i % 2) + "☆" * (5 - i // 2 - i % 2)
+    for i in range(11)
+)
+
 def format_currency(amount: Union[int, float], currency: str = '₽') -> str:
     """
     Форматирование денежных сумм
@@ -97,8 +110,7 @@ def normalize_email(email: str) -> str:
     normalized = str(email).lower().strip()
     
     # Простая валидация email
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if re.match(email_pattern, normalized):
+    if _EMAIL_RE.fullmatch(normalized):
         return normalized
     
     return ""
@@ -158,22 +170,37 @@ def format_duration(seconds: int) -> str:
     if seconds < 60:
         return f"{seconds}с"
     
-    minutes = seconds // 60
-    remaining_seconds = seconds % 60
-    
+    minutes, remaining_seconds = divmod(seconds, 60)
     if minutes < 60:
-        if remaining_seconds > 0:
-            return f"{minutes}м {remaining_seconds}с"
-        else:
-            return f"{minutes}м"
+        return f"{minutes}м {remaining_seconds}с" if remaining_seconds else f"{minutes}м"
+    
+    hours, remaining_minutes = divmod(minutes, 60)
+    return f"{hours}ч {remaining_minutes}м" if remaining_minutes else f"{hours}ч"
+
+def format_duration_batch(seconds: np.ndarray) -> List[str]:
+    """
+    Форматирование массива продолжительностей в читаемый вид
     
-    hours = minutes // 60
-    remaining_minutes = minutes % 60
+    Args:
+        seconds: Массив продолжительностей в секундах
     
-    if remaining_minutes > 0:
-        return f"{hours}ч {remaining_minutes}м"
-    else:
-        return f"{hours}ч"
+    Returns:
+        Список отформатированных строк (как у format_duration)
+    """
+    seconds = np.asarray(seconds, dtype=np.int64)
+    hours = seconds // 3600
+    minutes = (seconds // 60) % 60
+    total_minutes = seconds // 60
+    remaining_seconds = seconds % 60
+    
+    # Ветка выбирается по исходным секундам, как в format_duration (отрицательные - в секундах)
+    return [
+        f"{s}с" if s < 60 else
+        (f"{t}м {r}с" if r else f"{t}м") if s < 3600 else
+        (f"{h}ч {m}м" if m else f"{h}ч")
+        for s, t, r, h, m in zip(seconds.tolist(), total_minutes.tolist(), remaining_seconds.tolist(),
+                                 hours.tolist(), minutes.tolist())
+    ]
 
 def format_rating_stars(rating: float, max_stars: int = 5) -> str:
     """
@@ -186,6 +213,10 @@ def format_rating_stars(rating: float, max_stars: int = 5) -> str:
     Returns:
         Строка со звездами
     """
+    # Типовой случай: 5 звезд и рейтинг в диапазоне, берём готовую строку по шагу 0.5
+    if max_stars == 5 and 0 <= rating <= 5:
+        return _STAR_TABLE[int(rating * 2)]
+    
     full_stars = int(rating)
     half_star = 1 if (rating - full_stars) >= 0.5 else 0
     empty_stars = max_stars - full_stars - half_star
@@ -224,6 +255,35 @@ def format_change_indicator(current: float, previous: float) -> str:
     else:  # Изменение менее 5%
         return f"➖ {change_percent:.1f}%"
 
+def format_change_indicator_batch(current: np.ndarray, previous: np.ndarray) -> List[str]:
+    """
+    Форматирование индикаторов изменения для массивов значений
+    
+    Args:
+        current: Массив текущих значений
+        previous: Массив предыдущих значений
+    
+    Returns:
+        Список строк с индикаторами (как у format_change_indicator)
+    """
+    current = np.asarray(current, dtype=float)
+    previous = np.asarray(previous, dtype=float)
+    
+    has_base = previous != 0
+    change = np.divide(current - previous, previous, out=np.zeros_like(current), where=has_base)
+    change_percent = np.abs(change) * 100
+    
+    indicators = np.select(
+        [~has_base & (current > 0), ~has_base, change > 0.05, change < -0.05],
+        ["📈 Рост", "➖ Без изменений", "📈 +", "📉 -"],
+        default="➖ "
+    )
+    
+    return [
+        indicator if not base else f"{indicator}{percent:.1f}%"
+        for indicator, base, percent in zip(indicators.tolist(), has_base.tolist(), change_percent.tolist())
+    ]
+
 def format_status_emoji(value: float, thresholds: dict) -> str:
     """
     Форматирование статуса с помощью emoji на основе пороговых значений
@@ -283,10 +343,34 @@ def clean_utm_parameter(utm_value: str) -> str:
     
     return cleaned
 
+def make_row_formatter(widths: list, separator: str = " | ") -> Callable[[list], str]:
+    """
+    Создание форматтера строк таблицы с заранее подготовленными шаблонами колонок
+    
+    Args:
+        widths: Ширина каждой колонки
+        separator: Разделитель между колонками
+    
+    Returns:
+        Функция, форматирующая список ячеек в строку таблицы
+    """
+    formats = [f"{{:<{width}}}" for width in widths]
+    
+    def format_row(data: list) -> str:
+        return separator.join(
+            fmt.format(cell if len(cell) <= width else cell[:width - 3] + "...")
+            for fmt, cell, width in zip(formats, map(str, data), widths)
+        )
+    
+    return format_row
+
 def format_table_row(data: list, widths: list, separator: str = " | ") -> str:
     """
     Форматирование строки таблицы с выравниванием колонок
     
+    Для многострочных таблиц выгоднее один раз создать форматтер
+    через make_row_formatter и переиспользовать его для всех строк.
+    
     Args:
         data: Данные для строки
         widths: Ширина каждой колонки
@@ -295,15 +379,7 @@ def format_table_row(data: list, widths: list, separator: str = " | ") -> str:
     Returns:
         Отформатированная строка таблицы
     """
-    formatted_cells = []
-    
-    for i, (cell, width) in enumerate(zip(data, widths)):
-        cell_str = str(cell)
-        if len(cell_str) > width:
-            cell_str = cell_str[:width-3] + "..."
-        formatted_cells.append(cell_str.ljust(width))
-    
-    return separator.join(formatted_cells)
+    return make_row_formatter(widths, separator)(data)
 
 def format_bytes(bytes_value: int) -> str:
     """
@@ -315,18 +391,13 @@ def format_bytes(bytes_value: int) -> str:
     Returns:
         Отформатированная строка (например, "1.5 MB")
     """
-    units = ['B', 'KB', 'MB', 'GB', 'TB']
-    size = float(bytes_value)
-    unit_index = 0
-    
-    while size >= 1024 and unit_index < len(units) - 1:
-        size /= 1024
-        unit_index += 1
+    if bytes_value < 1024:
+        return f"{int(bytes_value)} {_BYTE_UNITS[0]}"
     
-    if unit_index == 0:
-        return f"{int(size)} {units[unit_index]}"
-    else:
-        return f"{size:.1f} {units[unit_index]}"
+    # Индекс единицы измерения = число полных степеней 1024 (по 10 бит), не выше TB
+    unit_index = min((int(bytes_value).bit_length() - 1) // 10, len(_BYTE_UNITS) - 1)
+    size = bytes_value / (1 << (10 * unit_index))
+    return f"{size:.1f} {_BYTE_UNITS[unit_index]}"
 
 def validate_phone(phone: str) -> bool:
     """
@@ -338,17 +409,37 @@ def validate_phone(phone: str) -> bool:
     Returns:
         True если номер валиден
     """
-    cleaned = clean_phone(phone)
+    if not phone:
+        return False
     
-    # Российский номер должен быть 11 цифр и начинаться с 7
-    if len(cleaned) == 11 and cleaned.startswith('7'):
-        return True
+    # Один проход по строке без регулярки: считаем цифры и запоминаем первую
+    digits = 0
+    first = 0
+    for c in str(phone):
+        if '0' <= c <= '9':
+            if not digits:
+                first = ord(c) - 48
+            digits += 1
+            if digits > 11:
+                return False
+    
+    # Российский номер: 11 цифр, начинается с 7 или 8 (8 приводится к 7 в clean_phone)
+    # Номер без кода страны: 10 цифр
+    return (digits == 11 and first in (7, 8)) or digits == 10
+
+def clean_and_validate_phone(phone: str) -> Tuple[str, bool]:
+    """
+    Очистка и валидация номера телефона за один проход
     
-    # Номер без кода страны (10 цифр)
-    if len(cleaned) == 10:
-        return True
+    Args:
+        phone: Исходный номер телефона
     
-    return False
+    Returns:
+        Кортеж (очищенный номер, валиден ли номер)
+    """
+    cleaned = clean_phone(phone)
+    is_valid = (len(cleaned) == 11 and cleaned[0] == '7') or len(cleaned) == 10
+    return cleaned, is_valid
 
 def validate_email(email: str) -> bool:
     """
@@ -363,8 +454,7 @@ def validate_email(email: str) -> bool:
     if not email:
         return False
     
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(email_pattern, email.strip()))
+    return bool(_EMAIL_RE.fullmatch(email.strip()))
 
 def escape_markdown(text: str) -> str:
     """
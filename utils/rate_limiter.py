@@ -5,58 +5,81 @@ Rate Limiting middleware для защиты от флуда
 import time
 import logging
 from functools import wraps
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
 from telegram import Update
 from telegram.ext import ContextTypes
-from services.cache import CacheService
-from config import RATE_LIMIT_PER_MINUTE, EMOJI
+
+# services.cache и config импортируются при первом использовании: импорт
+# services.cache создаёт подключение к Redis, а модулю достаточно декораторов
+if TYPE_CHECKING:
+    from services.cache import CacheService
 
 logger = logging.getLogger(__name__)
 
 class RateLimiter:
     """Класс для ограничения частоты запросов"""
     
-    def __init__(self, cache_service: Optional[CacheService] = None):
-        self.cache = cache_service or CacheService()
+    def __init__(self, cache_service: Optional['CacheService'] = None):
+        from config import RATE_LIMIT_PER_MINUTE
+        
+        if cache_service is None:
+            # Общий для процесса экземпляр из services.cache: одно подключение к Redis на все лимитеры
+            from services.cache import cache_service
+        
+        self.cache = cache_service
         self.rate_limit = RATE_LIMIT_PER_MINUTE
         
-    async def is_rate_limited(self, user_id: int) -> bool:
+    @staticmethod
+    def _current_window() -> Tuple[int, int]:
+        """Номер минутного окна и секунды до его окончания (одно чтение часов)"""
+        current_time = time.time_ns() // 1_000_000_000
+        return current_time // 60, 60 - current_time % 60
+    
+    @staticmethod
+    def _window_key(user_id: int, minute_window: int) -> bytes:
+        """Ключ счётчика окна (bytes уходят в Redis без перекодирования)"""
+        return b"rate_limit:%d:%d" % (user_id, minute_window)
+    
+    async def check(self, user_id: int) -> Tuple[bool, int, int]:
         """
-        Проверка, превышен ли лимит запросов для пользователя
+        Учёт запроса и проверка лимита за одно обращение
         
         Args:
             user_id: ID пользователя
             
         Returns:
-            True если лимит превышен, False если нет
+            (превышен ли лимит, оставшиеся запросы, секунды до сброса лимита)
         """
+        minute_window, reset_in = self._current_window()
+        
         try:
-            current_time = int(time.time())
-            minute_window = current_time // 60  # Окно в 1 минуту
-            
-            key = f"rate_limit:{user_id}:{minute_window}"
+            # Учитываем запрос и получаем счётчик окна за один атомарный обмен с Redis
+            key = self._window_key(user_id, minute_window)
+            current_count = self.cache.increment_window(key, ttl=70)  # TTL чуть больше минуты
             
-            # Получаем текущее количество запросов
-            current_requests = await self.cache.get(key)
+            if current_count is None:
+                # Кеш недоступен - не ограничиваем
+                return False, self.rate_limit, reset_in
             
-            if current_requests is None:
-                # Первый запрос в этом окне
-                await self.cache.set(key, 1, expire=70)  # TTL чуть больше минуты
-                return False
-            
-            current_count = int(current_requests)
-            
-            if current_count >= self.rate_limit:
-                return True
-            
-            # Увеличиваем счётчик
-            await self.cache.increment(key)
-            return False
+            return current_count > self.rate_limit, max(0, self.rate_limit - current_count), reset_in
             
         except Exception as e:
-            logger.error(f"Ошибка в rate limiter: {e}")
+            logger.error("Ошибка в rate limiter: %s", e)
             # В случае ошибки не блокируем пользователя
-            return False
+            return False, self.rate_limit, reset_in
+    
+    async def is_rate_limited(self, user_id: int) -> bool:
+        """
+        Проверка, превышен ли лимит запросов для пользователя
+        
+        Args:
+            user_id: ID пользователя
+            
+        Returns:
+            True если лимит превышен, False если нет
+        """
+        limited, _, _ = await self.check(user_id)
+        return limited
     
     async def get_remaining_requests(self, user_id: int) -> int:
         """
@@ -69,20 +92,12 @@ class RateLimiter:
             Количество оставшихся запросов
         """
         try:
-            current_time = int(time.time())
-            minute_window = current_time // 60
-            key = f"rate_limit:{user_id}:{minute_window}"
-            
-            current_requests = await self.cache.get(key)
-            
-            if current_requests is None:
-                return self.rate_limit
-            
-            used_requests = int(current_requests)
+            minute_window, _ = self._current_window()
+            used_requests = self.cache.get_counter(self._window_key(user_id, minute_window))
             return max(0, self.rate_limit - used_requests)
             
         except Exception as e:
-            logger.error(f"Ошибка получения оставшихся запросов: {e}")
+            logger.error("Ошибка получения оставшихся запросов: %s", e)
             return self.rate_limit
     
     async def get_time_until_reset(self, user_id: int) -> int:
@@ -95,12 +110,97 @@ class RateLimiter:
         Returns:
             Секунды до сброса лимита
         """
-        current_time = int(time.time())
-        seconds_in_current_minute = current_time % 60
-        return 60 - seconds_in_current_minute
+        _, reset_in = self._current_window()
+        return reset_in
+
+# Глобальный экземпляр rate limiter (создаётся при первом запросе)
+_rate_limiter = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Получение экземпляра rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+# Лимитер администраторов (лимит в 3 раза выше) и множество их ID, создаются один раз
+_admin_rate_limiter = None
+_admin_ids = None
+
+def get_admin_rate_limiter() -> RateLimiter:
+    """Получение экземпляра rate limiter для администраторов"""
+    global _admin_rate_limiter
+    if _admin_rate_limiter is None:
+        _admin_rate_limiter = RateLimiter()
+        _admin_rate_limiter.rate_limit *= 3
+    return _admin_rate_limiter
+
+def _get_admin_ids() -> frozenset:
+    """ID администраторов для проверки за O(1)"""
+    global _admin_ids
+    if _admin_ids is None:
+        from config import ADMIN_IDS
+        _admin_ids = frozenset(ADMIN_IDS)
+    return _admin_ids
+
+# Шаблоны сообщений о превышении лимита (warning, limit, seconds подставляются при форматировании)
+_LIMIT_MESSAGE = """
+{warning} **Превышен лимит запросов**
+
+Вы отправили слишком много команд. Максимум **{limit} команд в минуту**.
+
+⏰ Попробуйте снова через **{seconds} секунд**.
+
+💡 Это ограничение защищает бота от перегрузки и обеспечивает стабильную работу для всех пользователей.
+"""
 
-# Глобальный экземпляр rate limiter
-rate_limiter = RateLimiter()
+_ADMIN_LIMIT_MESSAGE = """
+{warning} **Превышен лимит запросов (админ)**
+
+Максимум **{limit} команд в минуту**.
+
+⏰ Попробуйте снова через **{seconds} секунд**.
+"""
+
+# Шаблоны с уже подставленными эмодзи и лимитом: {(шаблон, лимит): текст с полем {seconds}}
+_bound_limit_messages: Dict[Tuple[str, int], str] = {}
+
+def _limit_message(template: str, limit: int, seconds: int) -> str:
+    """Текст сообщения о превышении лимита; постоянная часть форматируется один раз"""
+    bound = _bound_limit_messages.get((template, limit))
+    if bound is None:
+        from config import EMOJI
+        bound = template.format(warning=EMOJI['warning'], limit=limit, seconds='{seconds}')
+        _bound_limit_messages[(template, limit)] = bound
+    return bound.format(seconds=seconds)
+
+async def _enforce(update: Update, limiter: RateLimiter, template: str) -> bool:
+    """
+    Проверка лимита и ответ пользователю при превышении
+    
+    Args:
+        update: Telegram Update объект
+        limiter: Rate limiter, по которому проверяется пользователь
+        template: Шаблон сообщения о превышении лимита
+        
+    Returns:
+        True если лимит превышен и команду выполнять не нужно
+    """
+    user_id = update.effective_user.id
+    limited, _, remaining_time = await limiter.check(user_id)
+    if not limited:
+        return False
+    
+    limit_message = _limit_message(template, limiter.rate_limit, remaining_time)
+    await update.message.reply_text(limit_message, parse_mode='Markdown')
+    
+    # Логируем превышение лимита. Уровень проверяется при каждом вызове (logging кеширует
+    # результат isEnabledFor до смены уровней), а не один раз при импорте: bot.py
+    # настраивает logging уже после импорта этого модуля
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning("Rate limit exceeded for user %s (@%s)", user_id, update.effective_user.username)
+    
+    return True
 
 def rate_limit(func):
     """
@@ -114,28 +214,7 @@ def rate_limit(func):
     """
     @wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
-        user_id = update.effective_user.id
-        
-        # Проверяем rate limit
-        if await rate_limiter.is_rate_limited(user_id):
-            # Получаем информацию для пользователя
-            remaining_time = await rate_limiter.get_time_until_reset(user_id)
-            
-            limit_message = f"""
-{EMOJI['warning']} **Превышен лимит запросов**
-
-Вы отправили слишком много команд. Максимум **{RATE_LIMIT_PER_MINUTE} команд в минуту**.
-
-⏰ Попробуйте снова через **{remaining_time} секунд**.
-
-💡 Это ограничение защищает бота от перегрузки и обеспечивает стабильную работу для всех пользователей.
-"""
-            
-            await update.message.reply_text(limit_message, parse_mode='Markdown')
-            
-            # Логируем превышение лимита
-            logger.warning(f"Rate limit exceeded for user {user_id} (@{update.effective_user.username})")
-            
+        if await _enforce(update, get_rate_limiter(), _LIMIT_MESSAGE):
             return
         
         # Если лимит не превышен, выполняем команду
@@ -155,43 +234,14 @@ def admin_rate_limit(func):
     """
     @wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
-        from config import ADMIN_IDS
-        
-        user_id = update.effective_user.id
-        
-        # Для админов увеличиваем лимит в 3 раза
-        admin_limiter = RateLimiter()
-        admin_limiter.rate_limit = RATE_LIMIT_PER_MINUTE * 3
-        
-        if user_id in ADMIN_IDS:
-            if await admin_limiter.is_rate_limited(user_id):
-                remaining_time = await admin_limiter.get_time_until_reset(user_id)
-                
-                limit_message = f"""
-{EMOJI['warning']} **Превышен лимит запросов (админ)**
-
-Максимум **{admin_limiter.rate_limit} команд в минуту**.
-
-⏰ Попробуйте снова через **{remaining_time} секунд**.
-"""
-                
-                await update.message.reply_text(limit_message, parse_mode='Markdown')
-                return
+        # Для админов лимит в 3 раза выше, для остальных - стандартный
+        if update.effective_user.id in _get_admin_ids():
+            limited = await _enforce(update, get_admin_rate_limiter(), _ADMIN_LIMIT_MESSAGE)
         else:
-            # Для обычных пользователей используем стандартный лимит
-            if await rate_limiter.is_rate_limited(user_id):
-                remaining_time = await rate_limiter.get_time_until_reset(user_id)
-                
-                limit_message = f"""
-{EMOJI['warning']} **Превышен лимит запросов**
-
-Максимум **{RATE_LIMIT_PER_MINUTE} команд в минуту**.
-
-⏰ Попробуйте снова через **{remaining_time} секунд**.
-"""
-                
-                await update.message.reply_text(limit_message, parse_mode='Markdown')
-                return
+            limited = await _enforce(update, get_rate_limiter(), _LIMIT_MESSAGE)
+        
+        if limited:
+            return
         
         # Выполняем команду
         await func(update, context)
@@ -208,6 +258,9 @@ async def get_rate_limit_stats(user_id: int) -> Dict[str, int]:
     Returns:
         Словарь со статистикой
     """
+    from config import RATE_LIMIT_PER_MINUTE
+    
+    rate_limiter = get_rate_limiter()
     remaining = await rate_limiter.get_remaining_requests(user_id)
     reset_time = await rate_limiter.get_time_until_reset(user_id)
     
@@ -2,303 +2,434 @@
 Функции для создания визуализаций и графиков
 """
 
+import matplotlib
+matplotlib.use('Agg')  # Используем non-GUI backend
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
 import pandas as pd
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime, timedelta
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, Union
+from datetime import datetime
 import io
 import base64
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 # Настройка стиля для русского языка
 plt.rcParams['font.family'] = 'DejaVu Sans'
 plt.rcParams['axes.unicode_minus'] = False
 
-def create_revenue_chart(data: List[Dict[str, Any]], title: str = "Выручка по каналам") -> str:
+logger = logging.getLogger(__name__)
+
+# Бот работает без GUI: отключаем интерактивный режим и упрощаем пути для Agg
+plt.ioff()
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
+plt.rcParams['agg.path.chunksize'] = 10000
+
+def _create_cached_figure(figsize: Tuple[float, float]) -> Figure:
+    """Создание переиспользуемой фигуры с собственным Agg-холстом (без pyplot)"""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+# Фигуры создаются один раз и очищаются перед каждым графиком,
+# вместо создания нового холста и рендерера на каждый вызов.
+# Matplotlib не потокобезопасен, поэтому каждая фигура защищена своим замком.
+_FIG_CACHE = {
+    'revenue': _create_cached_figure((12, 8)),
+    'funnel': _create_cached_figure((10, 8)),
+    'heatmap': _create_cached_figure((10, 8)),
+    'segments': _create_cached_figure((10, 8)),
+    'trend': _create_cached_figure((12, 8)),
+    'forecast': _create_cached_figure((12, 8)),
+    'comparison': _create_cached_figure((12, 8)),
+}
+_FIG_LOCKS = {name: threading.Lock() for name in _FIG_CACHE}
+
+# Разрешение по умолчанию: Telegram всё равно ужимает фото до ~1280 px по ширине,
+# а стоимость растеризации Agg растёт квадратично с dpi
+CHART_DPI = 100
+
+# Быстрое сжатие PNG: для графиков zlib уровня 1 почти не проигрывает по размеру
+# уровню 6 по умолчанию, но кодирует в разы быстрее
+_PNG_PIL_KWARGS = {'compress_level': 1, 'optimize': False}
+
+# Параметры savefig для поддерживаемых форматов
+_SAVE_KWARGS = {
+    'png': {'pil_kwargs': _PNG_PIL_KWARGS},
+    'svg': {},
+}
+
+# Палитры, подготовленные один раз при импорте
+_SET3_COLORS = plt.cm.Set3(np.arange(plt.cm.Set3.N))  # 12 цветов качественной палитры
+_STAGE_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']  # Этапы воронки и сегменты
+_HEATMAP_CMAP = plt.get_cmap('RdYlGn')
+
+# Сектора круговых диаграмм рисуются сплошной заливкой без обводки и сглаживания
+_PIE_WEDGEPROPS = {'linewidth': 0, 'antialiased': False}
+
+def _set3_colors(count: int) -> np.ndarray:
+    """Первые count цветов Set3 (сверх 12 повторяется последний, как у plt.cm.Set3(range(count)))"""
+    return _SET3_COLORS.take(np.arange(count), axis=0, mode='clip')
+
+# Масштаб столбцов тепловой карты: ROI и конверсия в %, CAC и LTV в тысячах рублей
+_HEATMAP_SCALE = np.array([100.0, 100.0, 1 / 1000, 1 / 1000])
+
+# Имена файлов графиков: метка запуска процесса + счётчик, без обращения к часам
+# на каждый график и без коллизий при нескольких графиках в одну секунду
+_CHARTS_DIR = Path("charts")
+_RUN_TAG = datetime.now().strftime('%Y%m%d_%H%M%S')
+_CHART_SEQ = itertools.count()
+_charts_dir_ready = False
+
+def _save_chart(fig: Figure, name: str, dpi: int, to_bytes: bool, fmt: str = 'png') -> Union[bytes, str]:
+    """
+    Сохранение готовой фигуры в PNG или SVG
+    
+    По умолчанию изображение отдаётся байтами из памяти и отправляется в Telegram
+    без записи на диск; файл в charts/ создаётся только при to_bytes=False (отладка).
+    
+    Раскладка задаётся заранее через tight_layout/subplots_adjust, поэтому
+    bbox_inches='tight' (лишний проход отрисовки для замера рамки) не используется.
+    SVG сохраняется без растеризации Agg - это компактнее для столбчатых и
+    линейных графиков, но Telegram принимает SVG только как документ, не как фото.
+    """
+    if fmt not in _SAVE_KWARGS:
+        raise ValueError(f"Неподдерживаемый формат графика: {fmt}")
+    save_kwargs = _SAVE_KWARGS[fmt]
+    
+    if to_bytes:
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, dpi=dpi, **save_kwargs)
+        return buf.getvalue()
+    
+    global _charts_dir_ready
+    if not _charts_dir_ready:
+        _CHARTS_DIR.mkdir(exist_ok=True)
+        _charts_dir_ready = True
+    
+    filepath = _CHARTS_DIR / f"{name}_{_RUN_TAG}_{next(_CHART_SEQ)}.{fmt}"
+    fig.savefig(filepath, format=fmt, dpi=dpi, **save_kwargs)
+    return str(filepath)
+
+# Текстовые столбцы входных данных (остальные - числовые)
+_TEXT_COLUMNS = frozenset({'name', 'emoji', 'date'})
+
+def _as_frame(data: Union[pd.DataFrame, List[Dict[str, Any]]], columns: Tuple[str, ...]) -> pd.DataFrame:
+    """Приведение входных данных к DataFrame: столбцы читаются целиком вместо обхода словарей"""
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    if not df.empty:
+        return df
+    
+    # У пустого ввода нет столбцов; создаем нужные (текстовые и числовые), чтобы график строился как пустой
+    return pd.DataFrame({column: pd.Series(dtype=object if column in _TEXT_COLUMNS else np.float64)
+                         for column in columns})
+
+def create_revenue_chart(data: Union[pd.DataFrame, List[Dict[str, Any]]], title: str = "Выручка по каналам",
+                         dpi: int = CHART_DPI, to_bytes: bool = True,
+                         fmt: str = 'png') -> Union[bytes, str]:
     """
     Создание столбчатой диаграммы выручки по каналам
     
     Args:
-        data: Список словарей с данными каналов
+        data: DataFrame или список словарей с данными каналов
         title: Заголовок графика
+        dpi: Разрешение изображения (300 - для печати)
+        to_bytes: Вернуть изображение в памяти вместо записи файла в charts/
+        fmt: Формат изображения: 'png' (по умолчанию, для отправки фото в Telegram) или 'svg'
     
     Returns:
-        Путь к созданному файлу изображения
+        Байты изображения в формате fmt или путь к файлу (при to_bytes=False)
     """
     # Подготовка данных
-    channels = [item['name'] for item in data]
-    revenues = [item['revenue'] for item in data]
-    
-    # Создание графика
-    plt.figure(figsize=(12, 8))
-    colors = plt.cm.Set3(range(len(channels)))
-    
-    bars = plt.bar(channels, revenues, color=colors)
-    
-    # Настройка графика
-    plt.title(title, fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Каналы', fontsize=12)
-    plt.ylabel('Выручка (₽)', fontsize=12)
-    
-    # Поворот подписей по оси X
-    plt.xticks(rotation=45, ha='right')
-    
-    # Добавление значений на столбцы
-    for bar, revenue in zip(bars, revenues):
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                f'{revenue:,.0f}₽', ha='center', va='bottom', fontsize=10)
-    
-    # Форматирование оси Y
-    plt.gca().yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x/1000:.0f}К'))
-    
-    # Сетка
-    plt.grid(axis='y', alpha=0.3)
-    
-    # Плотная компоновка
-    plt.tight_layout()
-    
-    # Сохранение
-    filename = f"revenue_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    filepath = Path(f"charts/{filename}")
-    filepath.parent.mkdir(exist_ok=True)
-    
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    plt.close()
+    df = _as_frame(data, ('name', 'revenue'))
+    channels = df['name'].tolist()
+    revenues = df['revenue'].to_numpy()
+    
+    with _FIG_LOCKS['revenue']:
+        # Создание графика
+        fig = _FIG_CACHE['revenue']
+        fig.clear()
+        ax = fig.add_subplot(111)
+        bars = ax.bar(channels, revenues, color=_set3_colors(len(channels)))
+        
+        # Настройка графика
+        ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+        ax.set_xlabel('Каналы', fontsize=12)
+        ax.set_ylabel('Выручка (₽)', fontsize=12)
+        
+        # Поворот подписей по оси X
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+        
+        # Добавление значений на столбцы
+        ax.bar_label(bars, labels=[f'{revenue:,.0f}₽' for revenue in revenues], fontsize=10, padding=3)
+        
+        # Форматирование оси Y
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'{x/1000:.0f}К'))
+        
+        # Сетка
+        ax.grid(axis='y', alpha=0.3)
+        
+        # Плотная компоновка
+        fig.tight_layout()
+        
+        # Сохранение
+        chart = _save_chart(fig, 'revenue_chart', dpi, to_bytes, fmt)
     
-    return str(filepath)
+    return chart
 
-def create_conversion_funnel(funnel_data: Dict[str, int], title: str = "Воронка конверсии") -> str:
+def create_conversion_funnel(funnel_data: Dict[str, int], title: str = "Воронка конверсии",
+                             dpi: int = CHART_DPI, to_bytes: bool = True,
+                             fmt: str = 'png') -> Union[bytes, str]:
     """
     Создание воронки конверсии
     
     Args:
         funnel_data: Словарь с данными воронки {'Показы': 10000, 'Клики': 500, ...}
         title: Заголовок графика
+        dpi: Разрешение изображения (300 - для печати)
+        to_bytes: Вернуть изображение в памяти вместо записи файла в charts/
+        fmt: Формат изображения: 'png' (по умолчанию, для отправки фото в Telegram) или 'svg'
     
     Returns:
-        Путь к созданному файлу изображения
+        Байты изображения в формате fmt или путь к файлу (при to_bytes=False)
     """
     stages = list(funnel_data.keys())
     values = list(funnel_data.values())
     
-    # Создание графика
-    plt.figure(figsize=(10, 8))
-    
-    # Цвета для каждого этапа
-    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
-    
-    # Создание воронки
-    y_positions = range(len(stages))
-    
-    for i, (stage, value, color) in enumerate(zip(stages, values, colors)):
-        # Ширина блока пропорциональна значению
-        width = value / max(values)
+    with _FIG_LOCKS['funnel']:
+        # Создание графика
+        fig = _FIG_CACHE['funnel']
+        fig.clear()
+        ax = fig.add_subplot(111)
         
-        # Рисуем прямоугольник
-        plt.barh(i, width, color=color, alpha=0.8, height=0.6)
+        # Создание воронки: ширина блока пропорциональна значению, все этапы одним вызовом barh
+        count = min(len(stages), len(_STAGE_COLORS))
+        counts = np.asarray(values, dtype=np.float64)
+        # Пустая воронка рисуется как пустой график (max() на пустом массиве не определен)
+        widths = counts[:count] / counts.max() if count else counts
+        bars = ax.barh(np.arange(count), widths, color=_STAGE_COLORS[:count], alpha=0.8, height=0.6)
         
-        # Добавляем текст с названием этапа и значением
-        plt.text(width/2, i, f'{stage}\n{value:,}', 
-                ha='center', va='center', fontweight='bold', fontsize=11)
+        # Название этапа и значение в центре блока
+        ax.bar_label(bars, labels=[f'{stage}\n{value:,}' for stage, value in zip(stages, values[:count])],
+                     label_type='center', fontweight='bold', fontsize=11)
         
-        # Добавляем процент конверсии (кроме первого этапа)
-        if i > 0:
-            conversion_rate = (value / values[i-1]) * 100
-            plt.text(width + 0.05, i, f'{conversion_rate:.1f}%', 
-                    va='center', fontsize=10, color='gray')
-    
-    # Настройка графика
-    plt.title(title, fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Относительное количество', fontsize=12)
-    
-    # Убираем оси
-    plt.gca().set_yticks([])
-    plt.gca().spines['top'].set_visible(False)
-    plt.gca().spines['right'].set_visible(False)
-    plt.gca().spines['left'].set_visible(False)
-    
-    plt.tight_layout()
-    
-    # Сохранение
-    filename = f"funnel_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    filepath = Path(f"charts/{filename}")
-    filepath.parent.mkdir(exist_ok=True)
-    
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    plt.close()
+        # Процент конверсии относительно предыдущего этапа (кроме первого)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = counts[1:count] / counts[:count - 1] * 100
+        for i, (width, rate) in enumerate(zip(widths[1:], rates), start=1):
+            ax.text(width + 0.05, i, f'{rate:.1f}%', va='center', fontsize=10, color='gray')
+        
+        # Настройка графика
+        ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+        ax.set_xlabel('Относительное количество', fontsize=12)
+        
+        # Убираем оси
+        ax.set_yticks([])
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.spines['left'].set_visible(False)
+        
+        fig.tight_layout()
+        
+        # Сохранение
+        chart = _save_chart(fig, 'funnel_chart', dpi, to_bytes, fmt)
     
-    return str(filepath)
+    return chart
 
-def create_roi_heatmap(channels_data: List[Dict[str, Any]], title: str = "Тепловая карта ROI по каналам") -> str:
+def create_roi_heatmap(channels_data: Union[pd.DataFrame, List[Dict[str, Any]]], title: str = "Тепловая карта ROI по каналам",
+                       dpi: int = CHART_DPI, to_bytes: bool = True,
+                       fmt: str = 'png') -> Union[bytes, str]:
     """
     Создание тепловой карты ROI по каналам и времени
     
     Args:
-        channels_data: Данные по каналам
+        channels_data: Данные по каналам (DataFrame или список словарей)
         title: Заголовок графика
+        dpi: Разрешение изображения (300 - для печати)
+        to_bytes: Вернуть изображение в памяти вместо записи файла в charts/
+        fmt: Формат изображения: 'png' (по умолчанию, для отправки фото в Telegram) или 'svg'
     
     Returns:
-        Путь к созданному файлу изображения
+        Байты изображения в формате fmt или путь к файлу (при to_bytes=False)
     """
     # Подготовка данных для тепловой карты
-    channels = [item['name'] for item in channels_data]
+    df = _as_frame(channels_data, ('name', 'roi', 'conversion', 'cac', 'ltv'))
+    channels = df['name'].tolist()
     metrics = ['ROI', 'Конверсия', 'CAC', 'LTV']
     
-    # Создание матрицы данных
-    data_matrix = []
-    for channel in channels_data:
-        row = [
-            channel['roi'] * 100,  # ROI в процентах
-            channel['conversion'] * 100,  # Конверсия в процентах
-            channel['cac'] / 1000,  # CAC в тысячах рублей
-            channel['ltv'] / 1000   # LTV в тысячах рублей
-        ]
-        data_matrix.append(row)
-    
-    # Создание DataFrame
-    df = pd.DataFrame(data_matrix, index=channels, columns=metrics)
-    
-    # Создание тепловой карты
-    plt.figure(figsize=(10, 8))
+    # Создание матрицы данных: ROI и конверсия в процентах, CAC и LTV в тысячах рублей
+    data_matrix = df[['roi', 'conversion', 'cac', 'ltv']].to_numpy(dtype=np.float64) * _HEATMAP_SCALE
     
-    # Нормализация данных для лучшего отображения
-    df_normalized = df.copy()
-    for col in df.columns:
-        df_normalized[col] = (df[col] - df[col].min()) / (df[col].max() - df[col].min())
+    # Нормализация min-max по столбцам (постоянный столбец превращается в нули)
+    column_min = data_matrix.min(axis=0)
+    column_range = data_matrix.max(axis=0) - column_min
+    normalized = (data_matrix - column_min) / np.where(column_range == 0, 1.0, column_range)
     
-    sns.heatmap(df_normalized, annot=df, fmt='.1f', cmap='RdYlGn', 
-                center=0.5, cbar_kws={'label': 'Нормализованные значения'})
-    
-    plt.title(title, fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Метрики', fontsize=12)
-    plt.ylabel('Каналы', fontsize=12)
-    
-    plt.tight_layout()
-    
-    # Сохранение
-    filename = f"heatmap_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    filepath = Path(f"charts/{filename}")
-    filepath.parent.mkdir(exist_ok=True)
-    
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    plt.close()
+    with _FIG_LOCKS['heatmap']:
+        # Создание тепловой карты
+        fig = _FIG_CACHE['heatmap']
+        fig.clear()
+        ax = fig.add_subplot(111)
+        
+        image = ax.imshow(normalized, cmap=_HEATMAP_CMAP, vmin=0, vmax=1, aspect='auto')
+        fig.colorbar(image, ax=ax, label='Нормализованные значения')
+        
+        ax.set_xticks(range(len(metrics)))
+        ax.set_xticklabels(metrics)
+        ax.set_yticks(range(len(channels)))
+        ax.set_yticklabels(channels)
+        
+        # Подписи исходных значений в ячейках (белым на тёмных краях шкалы RdYlGn)
+        for i, row in enumerate(data_matrix):
+            for j, value in enumerate(row):
+                text_color = 'white' if abs(normalized[i, j] - 0.5) > 0.3 else 'black'
+                ax.text(j, i, f'{value:.1f}', ha='center', va='center', fontsize=10, color=text_color)
+        
+        ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+        ax.set_xlabel('Метрики', fontsize=12)
+        ax.set_ylabel('Каналы', fontsize=12)
+        
+        fig.tight_layout()
+        
+        # Сохранение
+        chart = _save_chart(fig, 'heatmap', dpi, to_bytes, fmt)
     
-    return str(filepath)
+    return chart
 
-def create_segments_pie_chart(segments_data: List[Dict[str, Any]], title: str = "Распределение клиентов по сегментам") -> str:
+def create_segments_pie_chart(segments_data: Union[pd.DataFrame, List[Dict[str, Any]]],
+                              title: str = "Распределение клиентов по сегментам",
+                              dpi: int = CHART_DPI, to_bytes: bool = True,
+                              fmt: str = 'png') -> Union[bytes, str]:
     """
     Создание круговой диаграммы сегментов клиентов
     
     Args:
-        segments_data: Данные по сегментам
+        segments_data: Данные по сегментам (DataFrame или список словарей)
         title: Заголовок графика
+        dpi: Разрешение изображения (300 - для печати)
+        to_bytes: Вернуть изображение в памяти вместо записи файла в charts/
+        fmt: Формат изображения: 'png' (по умолчанию, для отправки фото в Telegram) или 'svg'
     
     Returns:
-        Путь к созданному файлу изображения
+        Байты изображения в формате fmt или путь к файлу (при to_bytes=False)
     """
     # Подготовка данных
-    labels = [f"{item['emoji']} {item['name']}" for item in segments_data]
-    sizes = [item['count'] for item in segments_data]
-    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
-    
-    # Создание круговой диаграммы
-    plt.figure(figsize=(10, 8))
-    
-    wedges, texts, autotexts = plt.pie(sizes, labels=labels, autopct='%1.1f%%', 
-                                      colors=colors, startangle=90, textprops={'fontsize': 11})
-    
-    # Улучшение внешнего вида
-    for autotext in autotexts:
-        autotext.set_color('white')
-        autotext.set_weight('bold')
-    
-    plt.title(title, fontsize=16, fontweight='bold', pad=20)
-    
-    # Легенда с дополнительной информацией
-    legend_labels = [f"{item['name']}: {item['count']} клиентов ({item['revenue']:,.0f}₽)" 
-                    for item in segments_data]
-    plt.legend(legend_labels, loc='center left', bbox_to_anchor=(1, 0.5))
-    
-    plt.axis('equal')
-    plt.tight_layout()
-    
-    # Сохранение
-    filename = f"segments_pie_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    filepath = Path(f"charts/{filename}")
-    filepath.parent.mkdir(exist_ok=True)
-    
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    plt.close()
+    df = _as_frame(segments_data, ('name', 'emoji', 'count'))
+    labels = (df['emoji'] + ' ' + df['name']).tolist()
+    sizes = df['count'].to_numpy()
+    
+    with _FIG_LOCKS['segments']:
+        # Создание круговой диаграммы
+        fig = _FIG_CACHE['segments']
+        fig.clear()
+        ax = fig.add_subplot(111)
+        
+        wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%', 
+                                          colors=_STAGE_COLORS, startangle=90, wedgeprops=_PIE_WEDGEPROPS,
+                                          textprops={'fontsize': 11})
+        
+        # Улучшение внешнего вида
+        for autotext in autotexts:
+            autotext.set_color('white')
+            autotext.set_weight('bold')
+        
+        ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+        
+        # Легенда с дополнительной информацией
+        legend_labels = [f"{name}: {count} клиентов ({revenue:,.0f}₽)" 
+                        for name, count, revenue in zip(df['name'], df['count'], df['revenue'])]
+        ax.legend(legend_labels, loc='center left', bbox_to_anchor=(1, 0.5))
+        
+        ax.set_aspect('equal')
+        fig.tight_layout()
+        # Место под легенду справа от диаграммы (сохранение идёт без bbox_inches='tight')
+        fig.subplots_adjust(right=0.7)
+        
+        # Сохранение
+        chart = _save_chart(fig, 'segments_pie', dpi, to_bytes, fmt)
     
-    return str(filepath)
+    return chart
 
-def create_trend_chart(data: List[Dict[str, Any]], title: str = "Динамика показателей") -> str:
+def create_trend_chart(data: List[Dict[str, Any]], title: str = "Динамика показателей",
+                       dpi: int = CHART_DPI, to_bytes: bool = True,
+                       fmt: str = 'png') -> Union[bytes, str]:
     """
     Создание графика трендов по времени
     
     Args:
         data: Данные с временными метками
         title: Заголовок графика
+        dpi: Разрешение изображения (300 - для печати)
+        to_bytes: Вернуть изображение в памяти вместо записи файла в charts/
+        fmt: Формат изображения: 'png' (по умолчанию, для отправки фото в Telegram) или 'svg'
     
     Returns:
-        Путь к созданному файлу изображения
+        Байты изображения в формате fmt или путь к файлу (при to_bytes=False)
     """
-    # Подготовка данных
-    dates = [datetime.strptime(item['date'], '%Y-%m-%d') for item in data]
-    revenues = [item['revenue'] for item in data]
-    leads = [item['leads'] for item in data]
-    
-    # Создание графика с двумя осями Y
-    fig, ax1 = plt.subplots(figsize=(12, 8))
-    
-    # График выручки
-    color1 = '#1f77b4'
-    ax1.set_xlabel('Дата', fontsize=12)
-    ax1.set_ylabel('Выручка (₽)', color=color1, fontsize=12)
-    line1 = ax1.plot(dates, revenues, color=color1, linewidth=2, marker='o', label='Выручка')
-    ax1.tick_params(axis='y', labelcolor=color1)
-    ax1.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x/1000:.0f}К'))
-    
-    # Вторая ось для лидов
-    ax2 = ax1.twinx()
-    color2 = '#ff7f0e'
-    ax2.set_ylabel('Количество лидов', color=color2, fontsize=12)
-    line2 = ax2.plot(dates, leads, color=color2, linewidth=2, marker='s', label='Лиды')
-    ax2.tick_params(axis='y', labelcolor=color2)
-    
-    # Форматирование оси X
-    ax1.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m'))
-    ax1.xaxis.set_major_locator(mdates.DayLocator(interval=7))
-    plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
-    
-    # Заголовок и легенда
-    plt.title(title, fontsize=16, fontweight='bold', pad=20)
-    
-    # Объединенная легенда
-    lines1, labels1 = ax1.get_legend_handles_labels()
-    lines2, labels2 = ax2.get_legend_handles_labels()
-    ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper left')
-    
-    # Сетка
-    ax1.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    
-    # Сохранение
-    filename = f"trend_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    filepath = Path(f"charts/{filename}")
-    filepath.parent.mkdir(exist_ok=True)
-    
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    plt.close()
+    # Подготовка данных: даты разбираются одним векторизованным проходом
+    records = _as_frame(data, ('date', 'revenue', 'leads'))
+    dates = pd.to_datetime(records['date'], format='%Y-%m-%d', cache=True).to_numpy()
+    revenues = records['revenue'].to_numpy()
+    leads = records['leads'].to_numpy()
+    
+    with _FIG_LOCKS['trend']:
+        # Создание графика с двумя осями Y
+        fig = _FIG_CACHE['trend']
+        fig.clear()
+        ax1 = fig.add_subplot(111)
+        
+        # График выручки
+        color1 = '#1f77b4'
+        ax1.set_xlabel('Дата', fontsize=12)
+        ax1.set_ylabel('Выручка (₽)', color=color1, fontsize=12)
+        line1 = ax1.plot(dates, revenues, color=color1, linewidth=2, marker='o', label='Выручка')
+        ax1.tick_params(axis='y', labelcolor=color1)
+        ax1.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'{x/1000:.0f}К'))
+        
+        # Вторая ось для лидов
+        ax2 = ax1.twinx()
+        color2 = '#ff7f0e'
+        ax2.set_ylabel('Количество лидов', color=color2, fontsize=12)
+        line2 = ax2.plot(dates, leads, color=color2, linewidth=2, marker='s', label='Лиды')
+        ax2.tick_params(axis='y', labelcolor=color2)
+        
+        # Форматирование оси X
+        ax1.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m'))
+        ax1.xaxis.set_major_locator(mdates.DayLocator(interval=7))
+        plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
+        
+        # Заголовок и легенда
+        ax2.set_title(title, fontsize=16, fontweight='bold', pad=20)
+        
+        # Объединенная легенда
+        lines1, labels1 = ax1.get_legend_handles_labels()
+        lines2, labels2 = ax2.get_legend_handles_labels()
+        ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper left')
+        
+        # Сетка
+        ax1.grid(True, alpha=0.3)
+        
+        fig.tight_layout()
+        
+        # Сохранение
+        chart = _save_chart(fig, 'trend_chart', dpi, to_bytes, fmt)
     
-    return str(filepath)
+    return chart
 
 def create_forecast_chart(historical_data: List[float], forecast_data: List[float], 
-                         title: str = "Прогноз выручки") -> str:
+                         title: str = "Прогноз выручки", dpi: int = CHART_DPI, to_bytes: bool = True,
+                         fmt: str = 'png') -> Union[bytes, str]:
     """
     Создание графика с прогнозом
     
@@ -306,68 +437,72 @@ def create_forecast_chart(historical_data: List[float], forecast_data: List[floa
         historical_data: Исторические данные
         forecast_data: Прогнозные данные
         title: Заголовок графика
+        dpi: Разрешение изображения (300 - для печати)
+        to_bytes: Вернуть изображение в памяти вместо записи файла в charts/
+        fmt: Формат изображения: 'png' (по умолчанию, для отправки фото в Telegram) или 'svg'
     
     Returns:
-        Путь к созданному файлу изображения
+        Байты изображения в формате fmt или путь к файлу (при to_bytes=False)
     """
-    # Подготовка временных меток
+    # Подготовка временных меток: один диапазон с шагом 30 дней, заканчивающийся сегодня
     total_periods = len(historical_data) + len(forecast_data)
-    dates = [datetime.now() - timedelta(days=30*(total_periods-i-1)) for i in range(total_periods)]
+    dates = pd.date_range(end=pd.Timestamp.now(), periods=total_periods, freq='30D').to_numpy()
     
     historical_dates = dates[:len(historical_data)]
     forecast_dates = dates[len(historical_data)-1:]  # Начинаем с последней исторической точки
     
-    # Создание графика
-    plt.figure(figsize=(12, 8))
-    
-    # Исторические данные
-    plt.plot(historical_dates, historical_data, 'o-', color='#1f77b4', 
-             linewidth=2, markersize=6, label='Исторические данные')
-    
-    # Прогнозные данные
-    forecast_values = [historical_data[-1]] + forecast_data  # Начинаем с последнего исторического значения
-    plt.plot(forecast_dates, forecast_values, 's--', color='#ff7f0e', 
-             linewidth=2, markersize=6, label='Прогноз', alpha=0.7)
-    
-    # Доверительный интервал для прогноза
-    forecast_upper = [val * 1.2 for val in forecast_values]
-    forecast_lower = [val * 0.8 for val in forecast_values]
-    plt.fill_between(forecast_dates, forecast_lower, forecast_upper, 
-                     alpha=0.2, color='#ff7f0e', label='Доверительный интервал')
-    
-    # Вертикальная линия, разделяющая прошлое и будущее
-    plt.axvline(x=historical_dates[-1], color='red', linestyle=':', alpha=0.7, label='Текущий момент')
-    
-    # Настройка графика
-    plt.title(title, fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Период', fontsize=12)
-    plt.ylabel('Выручка (₽)', fontsize=12)
-    
-    # Форматирование осей
-    plt.gca().yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x/1000:.0f}К'))
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%m.%Y'))
-    
-    # Поворот подписей дат
-    plt.xticks(rotation=45)
-    
-    # Легенда и сетка
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    
-    # Сохранение
-    filename = f"forecast_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    filepath = Path(f"charts/{filename}")
-    filepath.parent.mkdir(exist_ok=True)
-    
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    plt.close()
+    with _FIG_LOCKS['forecast']:
+        # Создание графика
+        fig = _FIG_CACHE['forecast']
+        fig.clear()
+        ax = fig.add_subplot(111)
+        
+        # Исторические данные
+        ax.plot(historical_dates, historical_data, 'o-', color='#1f77b4', 
+                linewidth=2, markersize=6, label='Исторические данные')
+        
+        # Прогнозные данные
+        # Начинаем с последнего исторического значения
+        forecast_values = np.asarray([historical_data[-1]] + list(forecast_data), dtype=np.float64)
+        ax.plot(forecast_dates, forecast_values, 's--', color='#ff7f0e', 
+                linewidth=2, markersize=6, label='Прогноз', alpha=0.7)
+        
+        # Доверительный интервал для прогноза (±20%)
+        forecast_upper = forecast_values * 1.2
+        forecast_lower = forecast_values * 0.8
+        ax.fill_between(forecast_dates, forecast_lower, forecast_upper, 
+                        alpha=0.2, color='#ff7f0e', label='Доверительный интервал')
+        
+        # Вертикальная линия, разделяющая прошлое и будущее
+        ax.axvline(x=historical_dates[-1], color='red', linestyle=':', alpha=0.7, label='Текущий момент')
+        
+        # Настройка графика
+        ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+        ax.set_xlabel('Период', fontsize=12)
+        ax.set_ylabel('Выручка (₽)', fontsize=12)
+        
+        # Форматирование осей
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'{x/1000:.0f}К'))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%m.%Y'))
+        
+        # Поворот подписей дат
+        ax.tick_params(axis='x', labelrotation=45)
+        
+        # Легенда и сетка
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+        
+        fig.tight_layout()
+        
+        # Сохранение
+        chart = _save_chart(fig, 'forecast_chart', dpi, to_bytes, fmt)
     
-    return str(filepath)
+    return chart
 
 def create_comparison_chart(data1: List[float], data2: List[float], 
-                          labels: List[str], title: str = "Сравнение показателей") -> str:
+                          labels: List[str], title: str = "Сравнение показателей",
+                          dpi: int = CHART_DPI, to_bytes: bool = True,
+                          fmt: str = 'png') -> Union[bytes, str]:
     """
     Создание сравнительной диаграммы
     
@@ -376,137 +511,301 @@ def create_comparison_chart(data1: List[float], data2: List[float],
         data2: Второй набор данных
         labels: Подписи для категорий
         title: Заголовок графика
+        dpi: Разрешение изображения (300 - для печати)
+        to_bytes: Вернуть изображение в памяти вместо записи файла в charts/
+        fmt: Формат изображения: 'png' (по умолчанию, для отправки фото в Telegram) или 'svg'
     
     Returns:
-        Путь к созданному файлу изображения
+        Байты изображения в формате fmt или путь к файлу (при to_bytes=False)
     """
     x = range(len(labels))
     width = 0.35
     
-    plt.figure(figsize=(12, 8))
-    
-    # Создание столбцов
-    bars1 = plt.bar([i - width/2 for i in x], data1, width, label='Текущий период', color='#1f77b4')
-    bars2 = plt.bar([i + width/2 for i in x], data2, width, label='Предыдущий период', color='#ff7f0e')
-    
-    # Добавление значений на столбцы
-    for bar in bars1:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                f'{height:,.0f}', ha='center', va='bottom', fontsize=9)
-    
-    for bar in bars2:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                f'{height:,.0f}', ha='center', va='bottom', fontsize=9)
-    
-    # Настройка графика
-    plt.title(title, fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Каналы', fontsize=12)
-    plt.ylabel('Значения', fontsize=12)
-    plt.xticks(x, labels, rotation=45, ha='right')
+    with _FIG_LOCKS['comparison']:
+        fig = _FIG_CACHE['comparison']
+        fig.clear()
+        ax = fig.add_subplot(111)
+        
+        # Создание столбцов
+        bars1 = ax.bar([i - width/2 for i in x], data1, width, label='Текущий период', color='#1f77b4')
+        bars2 = ax.bar([i + width/2 for i in x], data2, width, label='Предыдущий период', color='#ff7f0e')
+        
+        # Добавление значений на столбцы
+        ax.bar_label(bars1, fmt='{:,.0f}', fontsize=9, padding=3)
+        ax.bar_label(bars2, fmt='{:,.0f}', fontsize=9, padding=3)
+        
+        # Настройка графика
+        ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+        ax.set_xlabel('Каналы', fontsize=12)
+        ax.set_ylabel('Значения', fontsize=12)
+        ax.set_xticks(x)
+        ax.set_xticklabels(labels, rotation=45, ha='right')
+        
+        ax.legend()
+        ax.grid(axis='y', alpha=0.3)
+        fig.tight_layout()
+        
+        # Сохранение
+        chart = _save_chart(fig, 'comparison_chart', dpi, to_bytes, fmt)
     
-    plt.legend()
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
+    return chart
+
+class DashboardRenderer:
+    """
+    Сводный дашборд с переиспользуемыми графическими объектами
     
-    # Сохранение
-    filename = f"comparison_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    filepath = Path(f"charts/{filename}")
-    filepath.parent.mkdir(exist_ok=True)
+    Оси, столбцы, сектора и линия создаются один раз; пока число каналов и
+    сегментов не меняется, при обновлении меняются только данные artist-объектов
+    без очистки фигуры и повторной раскладки осей, подписей и tight_layout.
+    """
     
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    plt.close()
+    def __init__(self, figsize: Tuple[float, float] = (16, 12)):
+        self.fig = _create_cached_figure(figsize)
+        self._lock = threading.Lock()
+        self._shape = None  # (число каналов, число сегментов), под которое построены объекты
+    
+    def render(self, channels_data: Union[pd.DataFrame, List[Dict[str, Any]]],
+               segments_data: Union[pd.DataFrame, List[Dict[str, Any]]],
+               dpi: int = CHART_DPI, to_bytes: bool = True,
+               fmt: str = 'png') -> Union[bytes, str]:
+        """
+        Обновление данных дашборда и сохранение изображения
+        
+        Args:
+            channels_data: Данные по каналам (DataFrame или список словарей)
+            segments_data: Данные по сегментам (DataFrame или список словарей)
+            dpi: Разрешение изображения
+            to_bytes: Вернуть изображение в памяти вместо записи файла в charts/
+            fmt: Формат изображения: 'png' (по умолчанию, для отправки фото в Telegram) или 'svg'
+        
+        Returns:
+            Байты изображения в формате fmt или путь к файлу (при to_bytes=False)
+        """
+        channels_df = _as_frame(channels_data, ('name', 'revenue', 'roi', 'conversion')).head(6)
+        segments_df = _as_frame(segments_data, ('name', 'count'))
+        channels = channels_df['name'].str[:8].tolist()  # Ограничиваем длину названий
+        revenues = channels_df['revenue'].to_numpy()
+        roi_values = channels_df['roi'].to_numpy() * 100
+        conversion_values = channels_df['conversion'].to_numpy() * 100
+        segment_labels = segments_df['name'].tolist()
+        segment_sizes = segments_df['count'].to_numpy()
+        
+        with self._lock:
+            shape = (len(channels), len(segment_sizes))
+            if shape != self._shape:
+                self._build(channels, revenues, roi_values, conversion_values, segment_labels, segment_sizes)
+                self._shape = shape
+            else:
+                self._update(channels, revenues, roi_values, conversion_values, segment_labels, segment_sizes)
+            
+            self._title.set_text(f'Дашборд маркетинговой аналитики - {datetime.now().strftime("%d.%m.%Y")}')
+            
+            # Сохранение
+            return _save_chart(self.fig, 'dashboard', dpi, to_bytes, fmt)
+    
+    def _build(self, channels, revenues, roi_values, conversion_values, segment_labels, segment_sizes) -> None:
+        """Полное построение дашборда"""
+        fig = self.fig
+        fig.clear()
+        ((ax1, ax2), (ax3, ax4)) = fig.subplots(2, 2)
+        self._axes = (ax1, ax2, ax3, ax4)
+        positions = range(len(channels))
+        
+        # 1. Выручка по каналам (столбчатая диаграмма)
+        self._revenue_bars = ax1.bar(positions, revenues, color=_set3_colors(len(channels)))
+        ax1.set_title('Выручка по каналам', fontweight='bold')
+        ax1.set_ylabel('Выручка (₽)')
+        ax1.set_xticks(positions)
+        ax1.set_xticklabels(channels, rotation=45)
+        
+        # Значения на столбцах
+        self._revenue_labels = [
+            ax1.text(bar.get_x() + bar.get_width()/2., revenue * 1.01,
+                     f'{revenue/1000:.0f}К', ha='center', va='bottom', fontsize=9)
+            for bar, revenue in zip(self._revenue_bars, revenues)
+        ]
+        
+        # 2. ROI по каналам (горизонтальная диаграмма)
+        self._roi_bars = ax2.barh(positions, roi_values, color=_roi_colors(roi_values), alpha=0.7)
+        ax2.set_yticks(positions)
+        ax2.set_yticklabels(channels)
+        ax2.set_title('ROI по каналам (%)', fontweight='bold')
+        ax2.set_xlabel('ROI (%)')
+        ax2.axvline(x=0, color='black', linestyle='-', alpha=0.3)
+        
+        # 3. Сегменты клиентов (круговая диаграмма)
+        self._wedges, self._pie_labels, self._pie_percents = ax3.pie(
+            segment_sizes, labels=segment_labels, autopct='%1.1f%%', startangle=90,
+            wedgeprops=_PIE_WEDGEPROPS
+        )
+        ax3.set_aspect('equal')
+        ax3.set_title('Распределение клиентов', fontweight='bold')
+        
+        # 4. Конверсия по каналам (линейный график)
+        self._conversion_line, = ax4.plot(positions, conversion_values, 'o-', linewidth=2, markersize=6)
+        ax4.set_title('Конверсия по каналам (%)', fontweight='bold')
+        ax4.set_ylabel('Конверсия (%)')
+        ax4.set_xticks(positions)
+        ax4.set_xticklabels(channels, rotation=45)
+        ax4.grid(True, alpha=0.3)
+        
+        # Общий заголовок
+        self._title = fig.suptitle('', fontsize=18, fontweight='bold')
+        
+        fig.tight_layout()
+        fig.subplots_adjust(top=0.93)
     
-    return str(filepath)
+    def _update(self, channels, revenues, roi_values, conversion_values, segment_labels, segment_sizes) -> None:
+        """Обновление данных существующих объектов без перестроения осей"""
+        ax1, ax2, ax3, ax4 = self._axes
+        
+        # 1. Выручка: высоты столбцов и подписи над ними
+        for bar, label, revenue in zip(self._revenue_bars, self._revenue_labels, revenues):
+            bar.set_height(revenue)
+            label.set_y(revenue * 1.01)
+            label.set_text(f'{revenue/1000:.0f}К')
+        ax1.set_xticklabels(channels, rotation=45)
+        
+        # 2. ROI: длины и цвета столбцов
+        for bar, roi, color in zip(self._roi_bars, roi_values, _roi_colors(roi_values)):
+            bar.set_width(roi)
+            bar.set_color(color)
+        ax2.set_yticklabels(channels)
+        
+        # 3. Сегменты: углы секторов и позиции подписей (как в Axes.pie при startangle=90)
+        total = float(sum(segment_sizes))
+        theta = 90.0
+        for wedge, label, percent, name, size in zip(self._wedges, self._pie_labels, self._pie_percents,
+                                                     segment_labels, segment_sizes):
+            share = size / total
+            wedge.set_theta1(theta)
+            wedge.set_theta2(theta + 360 * share)
+            middle = np.deg2rad(theta + 180 * share)
+            x, y = np.cos(middle), np.sin(middle)
+            label.set_position((1.1 * x, 1.1 * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            label.set_text(name)
+            percent.set_position((0.6 * x, 0.6 * y))
+            percent.set_text(f'{share * 100:.1f}%')
+            theta += 360 * share
+        
+        # 4. Конверсия: данные линии
+        self._conversion_line.set_ydata(conversion_values)
+        ax4.set_xticklabels(channels, rotation=45)
+        
+        for ax in (ax1, ax2, ax4):
+            ax.relim()
+            ax.autoscale_view()
+
+def _roi_colors(roi_values: np.ndarray) -> List[str]:
+    """Цвета столбцов ROI: зелёный для прибыльных каналов, красный для убыточных"""
+    return ['green' if roi > 0 else 'red' for roi in roi_values]
+
+# Дашборд переиспользуется между вызовами create_dashboard_summary
+_dashboard_renderer = DashboardRenderer()
 
-def create_dashboard_summary(channels_data: List[Dict[str, Any]], 
-                           segments_data: List[Dict[str, Any]]) -> str:
+def create_dashboard_summary(channels_data: Union[pd.DataFrame, List[Dict[str, Any]]], 
+                           segments_data: Union[pd.DataFrame, List[Dict[str, Any]]], dpi: int = CHART_DPI, to_bytes: bool = True,
+                           fmt: str = 'png') -> Union[bytes, str]:
     """
     Создание сводного дашборда с несколькими графиками
     
     Args:
-        channels_data: Данные по каналам
-        segments_data: Данные по сегментам
+        channels_data: Данные по каналам (DataFrame или список словарей)
+        segments_data: Данные по сегментам (DataFrame или список словарей)
+        dpi: Разрешение изображения (300 - для печати)
+        to_bytes: Вернуть изображение в памяти вместо записи файла в charts/
+        fmt: Формат изображения: 'png' (по умолчанию, для отправки фото в Telegram) или 'svg'
     
     Returns:
-        Путь к созданному файлу изображения
+        Байты изображения в формате fmt или путь к файлу (при to_bytes=False)
     """
-    # Создание фигуры с подграфиками
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
-    
-    # 1. Выручка по каналам (столбчатая диаграмма)
-    channels = [item['name'][:8] for item in channels_data[:6]]  # Ограничиваем длину названий
-    revenues = [item['revenue'] for item in channels_data[:6]]
-    
-    bars = ax1.bar(channels, revenues, color=plt.cm.Set3(range(len(channels))))
-    ax1.set_title('Выручка по каналам', fontweight='bold')
-    ax1.set_ylabel('Выручка (₽)')
-    ax1.tick_params(axis='x', rotation=45)
-    
-    # Значения на столбцах
-    for bar, revenue in zip(bars, revenues):
-        height = bar.get_height()
-        ax1.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                f'{revenue/1000:.0f}К', ha='center', va='bottom', fontsize=9)
-    
-    # 2. ROI по каналам (горизонтальная диаграмма)
-    roi_values = [item['roi'] * 100 for item in channels_data[:6]]
-    colors = ['green' if roi > 0 else 'red' for roi in roi_values]
-    
-    ax2.barh(channels, roi_values, color=colors, alpha=0.7)
-    ax2.set_title('ROI по каналам (%)', fontweight='bold')
-    ax2.set_xlabel('ROI (%)')
-    ax2.axvline(x=0, color='black', linestyle='-', alpha=0.3)
-    
-    # 3. Сегменты клиентов (круговая диаграмма)
-    segment_labels = [item['name'] for item in segments_data]
-    segment_sizes = [item['count'] for item in segments_data]
-    
-    ax3.pie(segment_sizes, labels=segment_labels, autopct='%1.1f%%', startangle=90)
-    ax3.set_title('Распределение клиентов', fontweight='bold')
-    
-    # 4. Конверсия по каналам (линейный график)
-    conversion_values = [item['conversion'] * 100 for item in channels_data[:6]]
-    
-    ax4.plot(range(len(channels)), conversion_values, 'o-', linewidth=2, markersize=6)
-    ax4.set_title('Конверсия по каналам (%)', fontweight='bold')
-    ax4.set_ylabel('Конверсия (%)')
-    ax4.set_xticks(range(len(channels)))
-    ax4.set_xticklabels(channels, rotation=45)
-    ax4.grid(True, alpha=0.3)
-    
-    # Общий заголовок
-    fig.suptitle(f'Дашборд маркетинговой аналитики - {datetime.now().strftime("%d.%m.%Y")}', 
-                fontsize=18, fontweight='bold')
-    
-    plt.tight_layout()
-    plt.subplots_adjust(top=0.93)
+    return _dashboard_renderer.render(channels_data, segments_data, dpi, to_bytes, fmt)
+
+# Построители графиков, доступные для параллельной генерации
+_CHART_BUILDERS = {
+    'revenue': create_revenue_chart,
+    'funnel': create_conversion_funnel,
+    'heatmap': create_roi_heatmap,
+    'segments': create_segments_pie_chart,
+    'trend': create_trend_chart,
+    'forecast': create_forecast_chart,
+    'comparison': create_comparison_chart,
+    'dashboard': create_dashboard_summary,
+}
+
+# Пул процессов создаётся при первом обращении, а не при импорте
+_chart_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_chart_pool() -> ProcessPoolExecutor:
+    """Получение пула процессов для рендеринга графиков"""
+    global _chart_pool
+    if _chart_pool is None:
+        # spawn вместо fork: родительский процесс бота многопоточный (планировщик, asyncio),
+        # а модуль при импорте в воркере сам прогревает кэш шрифтов через _warmup()
+        _chart_pool = ProcessPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _chart_pool
+
+def create_all_charts(payload: Dict[str, Dict[str, Any]]) -> Dict[str, bytes]:
+    """
+    Параллельное создание нескольких независимых графиков в отдельных процессах
     
-    # Сохранение
-    filename = f"dashboard_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    filepath = Path(f"charts/{filename}")
-    filepath.parent.mkdir(exist_ok=True)
+    Функция блокирует вызывающий поток до готовности всех графиков, поэтому из
+    async-обработчиков ее нужно вызывать через asyncio.to_thread / run_in_executor.
     
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    plt.close()
+    Args:
+        payload: Словарь {тип графика: аргументы функции}, например
+                 {'revenue': {'data': [...]}, 'trend': {'data': [...]}}.
+                 Типы графиков - ключи _CHART_BUILDERS; to_bytes всегда
+                 принудительно True, fmt из аргументов учитывается
     
-    return str(filepath)
+    Returns:
+        Словарь {тип графика: байты изображения} (PNG, либо SVG для fmt='svg')
+    """
+    pool = _get_chart_pool()
+    futures = {
+        pool.submit(_CHART_BUILDERS[name], **{**kwargs, 'to_bytes': True}): name
+        for name, kwargs in payload.items()
+    }
+    return {futures[future]: future.result() for future in as_completed(futures)}
 
 def cleanup_old_charts(days_old: int = 7):
     """
     Очистка старых графиков
     
+    Нужна только если графики сохранялись на диск (to_bytes=False),
+    по умолчанию графики отдаются байтами и файлов не создают.
+    
     Args:
         days_old: Возраст файлов в днях для удаления
     """
-    charts_dir = Path("charts")
-    if not charts_dir.exists():
+    cutoff_timestamp = time.time() - days_old * 86400
+    
+    try:
+        entries = os.scandir(_CHARTS_DIR)
+    except FileNotFoundError:
         return
     
-    cutoff_time = datetime.now() - timedelta(days=days_old)
+    # DirEntry кэширует результат stat, поэтому на файл приходится один системный вызов
+    with entries:
+        for entry in entries:
+            if entry.name.endswith(('.png', '.svg')) and entry.stat().st_mtime < cutoff_timestamp:
+                os.unlink(entry.path)
+                logger.debug("Удален старый график: %s", entry.path)
+
+def _warmup() -> None:
+    """
+    Прогрев Matplotlib при импорте модуля
     
-    for chart_file in charts_dir.glob("*.png"):
-        if chart_file.stat().st_mtime < cutoff_time.timestamp():
-            chart_file.unlink()
-            print(f"Удален старый график: {chart_file}")
+    Первый savefig после запуска сканирует системные шрифты и заполняет кэш
+    font manager; делаем это сразу, чтобы не тормозить первый запрос к боту.
+    """
+    fig = _create_cached_figure((2, 1))
+    ax = fig.add_subplot(111)
+    ax.text(0.5, 0.5, 'DejaVu Sans тест ₽', ha='center', va='center')
+    fig.savefig(io.BytesIO(), format='png', dpi=50)
+
+_warmup()
@@ -4,83 +4,217 @@
 Проверяет наличие всех необходимых переменных окружения и их корректность
 """
 
+import argparse
 import os
+import re
+import mmap
 import sys
 import json
-from typing import List, Tuple
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
-def check_required_env_vars() -> List[Tuple[str, str, bool]]:
+# orjson (если установлен) разбирает JSON быстрее стандартного json;
+# его JSONDecodeError - подкласс json.JSONDecodeError, поэтому обработка ошибок общая
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Обязательные переменные: (переменная, описание, допустимые названия)
+_REQ_SPEC = (
+    ('BOT_TOKEN', 'Токен Telegram бота', ('BOT_TOKEN', 'TELEGRAM_TOKEN')),
+    ('GOOGLE_CREDENTIALS_JSON', 'JSON ключ Google API или путь к файлу', ('GOOGLE_CREDENTIALS_JSON', 'GOOGLE_CREDENTIALS_FILE')),
+    ('SPREADSHEET_ID', 'ID основной Google таблицы', ('SPREADSHEET_ID',)),
+)
+
+# Опциональные переменные
+_OPT_SPEC = tuple((var_name, description, (var_name,)) for var_name, description in (
+    ('ADMIN_IDS', 'ID администраторов Telegram'),
+    ('REPORT_CHAT_ID', 'ID чатов для автоматических отчётов'),
+    ('METRIKA_COUNTER_ID', 'ID счётчика Яндекс.Метрики'),
+    ('METRIKA_OAUTH_TOKEN', 'OAuth токен Яндекс.Метрики'),
+    ('GA_PROPERTY_ID', 'ID свойства Google Analytics'),
+    ('AMOCRM_SHEET_ID', 'ID таблицы AmoCRM'),
+    ('USE_POSTGRES', 'Использование PostgreSQL'),
+    ('DATABASE_URL', 'URL подключения к PostgreSQL'),
+    ('REDIS_HOST', 'Хост Redis сервера'),
+    ('DEBUG_MODE', 'Режим отладки'),
+    ('TIMEZONE', 'Часовой пояс'),
+))
+
+# Все переменные окружения, которые читает валидатор. Ключи снимка окружения - эти же
+# (интернированные) объекты строк, поэтому поиск по литералам идет по совпадению указателей
+_ALL_KEYS = frozenset(sys.intern(alias) for spec in (_REQ_SPEC, _OPT_SPEC) for _, _, aliases in spec for alias in aliases)
+
+# Списки ID: переменная -> название в отчете
+_ID_VARS = {'ADMIN_IDS': 'Admin IDs', 'REPORT_CHAT_ID': 'Report Chat IDs'}
+
+# Форматы ID Google таблицы и токена бота (например: 123456789:ABC-DEF1234ghIkl-zyx57W2v1u123ew11)
+_SHEET_ID_RE = re.compile(r'\A[A-Za-z0-9_\-]{20,}\Z')
+_TG_TOKEN_RE = re.compile(r'\A\d{5,}:[A-Za-z0-9_\-]{30,}\Z')
+
+# Обязательные поля ключа сервисного аккаунта Google (порядок - для сообщений)
+_REQUIRED_CREDS_ORDER = ('type', 'project_id', 'private_key', 'client_email')
+_REQUIRED_CREDS_GETTER = itemgetter(*_REQUIRED_CREDS_ORDER)
+
+# Ключ сервисного аккаунта занимает пару КБ; файлы крупнее этого не разбираем
+_MAX_CREDS_FILE_SIZE = 64 * 1024
+# Для файлов меньше этого размера настройка mmap дороже обычного чтения
+_MMAP_MIN_SIZE = 4 * 1024
+
+# Список ID через запятую: пустые элементы допустимы, ID может быть отрицательным (группы)
+# и, как в int(), содержать одиночные подчеркивания между цифрами
+_IDS_LIST_RE = re.compile(r'\A\s*(?:[+-]?\d+(?:_\d+)*\s*)?(?:,\s*(?:[+-]?\d+(?:_\d+)*\s*)?)*\Z')
+_ID_RE = re.compile(r'[+-]?\d+(?:_\d+)*')
+
+# Значки статуса, индексируются результатом проверки (False -> 0, True -> 1)
+_OK_MARK = ("❌", "✅")
+_OPT_MARK = ("⚪", "✅")
+_WARN_MARK = ("⚠️", "✅")
+
+# Шаблоны строк отчета
+_HEADER = "🔍 Проверка конфигурации Telegram-бота"
+_RULE = "=" * 60
+_ROW = "  %s %s: %s"
+_IDS_ROW = "  %s %s"
+_FAILURE_LINES = (
+    "❌ Обнаружены ошибки в конфигурации. Исправьте их перед запуском.",
+    "\n💡 Подсказки:",
+    "  1. Скопируйте .env.example в .env",
+    "  2. Заполните обязательные переменные",
+    "  3. Получите токен бота у @BotFather",
+    "  4. Настройте Google API credentials",
+)
+
+def _snapshot_env(keys: FrozenSet[str] = _ALL_KEYS) -> Dict[str, str]:
     """
-    Проверка обязательных переменных окружения
+    Снимок нужных переменных окружения (только заданных), читается один раз за запуск
     
+    Args:
+        keys: Имена переменных
+        
     Returns:
-        Список кортежей (переменная, описание, найдена)
+        Словарь {переменная: значение}
     """
-    required_vars = [
-        ('BOT_TOKEN', 'Токен Telegram бота', False),
-        ('GOOGLE_CREDENTIALS_JSON', 'JSON ключ Google API или путь к файлу', False),
-        ('SPREADSHEET_ID', 'ID основной Google таблицы', False),
-    ]
+    environ = os.environ
+    return {key: environ[key] for key in keys if key in environ}
+
+def _nonblank(value: Optional[str]) -> bool:
+    """
+    Проверка, что значение задано и не состоит из одних пробелов (без копии строки, в отличие от strip)
     
-    results = []
-    for var_name, description, _ in required_vars:
-        # Проверяем основную переменную и альтернативные названия
-        value = None
-        if var_name == 'BOT_TOKEN':
-            value = os.getenv('BOT_TOKEN') or os.getenv('TELEGRAM_TOKEN')
-        elif var_name == 'GOOGLE_CREDENTIALS_JSON':
-            value = os.getenv('GOOGLE_CREDENTIALS_JSON') or os.getenv('GOOGLE_CREDENTIALS_FILE')
-        else:
-            value = os.getenv(var_name)
+    Args:
+        value: Значение переменной
         
-        is_found = bool(value and value.strip())
+    Returns:
+        True, если значение непустое
+    """
+    return bool(value) and not value.isspace()
+
+def _scan(env: Dict[str, str], spec: Tuple[Tuple[str, str, Tuple[str, ...]], ...]) -> List[Tuple[str, str, bool]]:
+    """
+    Проверка наличия переменных окружения по таблице спецификаций
+    
+    Args:
+        env: Снимок переменных окружения
+        spec: Кортежи (переменная, описание, допустимые названия)
+        
+    Returns:
+        Список кортежей (переменная, описание, найдена)
+    """
+    results = []
+    for var_name, description, aliases in spec:
+        # Переменная найдена, если непуста основная или любая из альтернативных
+        is_found = any(_nonblank(env.get(alias)) for alias in aliases)
         results.append((var_name, description, is_found))
     
     return results
 
-def check_optional_env_vars() -> List[Tuple[str, str, bool]]:
+def check_required_env_vars(env: Dict[str, str]) -> List[Tuple[str, str, bool]]:
+    """
+    Проверка обязательных переменных окружения
+    
+    Args:
+        env: Снимок переменных окружения
+        
+    Returns:
+        Список кортежей (переменная, описание, найдена)
+    """
+    return _scan(env, _REQ_SPEC)
+
+def check_optional_env_vars(env: Dict[str, str]) -> List[Tuple[str, str, bool]]:
     """
     Проверка опциональных переменных окружения
     
+    Args:
+        env: Снимок переменных окружения
+        
     Returns:
         Список кортежей (переменная, описание, найдена)
     """
-    optional_vars = [
-        ('ADMIN_IDS', 'ID администраторов Telegram'),
-        ('REPORT_CHAT_ID', 'ID чатов для автоматических отчётов'),
-        ('METRIKA_COUNTER_ID', 'ID счётчика Яндекс.Метрики'),
-        ('METRIKA_OAUTH_TOKEN', 'OAuth токен Яндекс.Метрики'),
-        ('GA_PROPERTY_ID', 'ID свойства Google Analytics'),
-        ('AMOCRM_SHEET_ID', 'ID таблицы AmoCRM'),
-        ('USE_POSTGRES', 'Использование PostgreSQL'),
-        ('DATABASE_URL', 'URL подключения к PostgreSQL'),
-        ('REDIS_HOST', 'Хост Redis сервера'),
-        ('DEBUG_MODE', 'Режим отладки'),
-        ('TIMEZONE', 'Часовой пояс')
-    ]
+    return _scan(env, _OPT_SPEC)
+
+def _check_creds(credentials) -> List[str]:
+    """
+    Поиск отсутствующих обязательных полей в ключе Google API
     
-    results = []
-    for var_name, description in optional_vars:
-        value = os.getenv(var_name)
-        is_found = bool(value and value.strip())
-        results.append((var_name, description, is_found))
+    Args:
+        credentials: Разобранный JSON ключа
+        
+    Returns:
+        Список отсутствующих полей (пустой, если ключ полный)
+    """
+    # Обычный случай (все поля на месте) - один вызов itemgetter на C
+    try:
+        _REQUIRED_CREDS_GETTER(credentials)
+        return []
+    except (KeyError, TypeError):
+        # KeyError - не хватает поля; TypeError - ключ не объект (например, JSON-массив)
+        pass
     
-    return results
+    # Проверка через `in` работает и для JSON-массива (в т.ч. из объектов), в отличие от операций над множествами
+    return [field for field in _REQUIRED_CREDS_ORDER if field not in credentials]
 
-def validate_json_credentials() -> Tuple[bool, str]:
+def _read_creds_file(credentials_file: str, file_size: int):
     """
-    Валидация JSON ключей Google API
+    Чтение и разбор файла с ключом Google API
     
+    Args:
+        credentials_file: Путь к файлу
+        file_size: Размер файла по os.stat
+        
+    Returns:
+        Разобранный JSON
+    """
+    with open(credentials_file, 'rb') as f:
+        # orjson разбирает буфер mmap напрямую, без промежуточной копии в bytes
+        if _loads is json.loads or file_size < _MMAP_MIN_SIZE:
+            return _loads(f.read())
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return _loads(view)
+
+@lru_cache(maxsize=8)
+def _validate_creds_cached(json_content: str, credentials_file: str,
+                           file_stamp: Optional[Tuple[int, int]]) -> Tuple[bool, str]:
+    """
+    Разбор и проверка ключа Google API (кэшируется, пока не изменились JSON или файл)
+    
+    Args:
+        json_content: Значение GOOGLE_CREDENTIALS_JSON
+        credentials_file: Путь к файлу с ключом
+        file_stamp: (mtime_ns, размер) файла или None, если файла нет
+        
     Returns:
         Кортеж (валидный, сообщение об ошибке)
     """
     # Проверяем прямой JSON
-    json_content = os.getenv('GOOGLE_CREDENTIALS_JSON', '')
     if json_content:
         try:
-            credentials = json.loads(json_content)
-            required_fields = ['type', 'project_id', 'private_key', 'client_email']
-            missing_fields = [field for field in required_fields if field not in credentials]
+            credentials = _loads(json_content)
+            missing_fields = _check_creds(credentials)
             
             if missing_fields:
                 return False, f"В JSON ключе отсутствуют поля: {', '.join(missing_fields)}"
@@ -90,14 +224,15 @@ def validate_json_credentials() -> Tuple[bool, str]:
             return False, "Невалидный JSON в GOOGLE_CREDENTIALS_JSON"
     
     # Проверяем файл
-    credentials_file = os.getenv('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
-    if os.path.exists(credentials_file):
+    if file_stamp is not None:
+        file_size = file_stamp[1]
+        if file_size > _MAX_CREDS_FILE_SIZE:
+            return False, f"{credentials_file} слишком большой ({file_size} b), похоже не credentials"
+        
         try:
-            with open(credentials_file, 'r') as f:
-                credentials = json.load(f)
+            credentials = _read_creds_file(credentials_file, file_size)
             
-            required_fields = ['type', 'project_id', 'private_key', 'client_email']
-            missing_fields = [field for field in required_fields if field not in credentials]
+            missing_fields = _check_creds(credentials)
             
             if missing_fields:
                 return False, f"В файле {credentials_file} отсутствуют поля: {', '.join(missing_fields)}"
@@ -108,132 +243,193 @@ def validate_json_credentials() -> Tuple[bool, str]:
     
     return False, "Не найден ни JSON ключ, ни файл с credentials"
 
-def validate_spreadsheet_id() -> Tuple[bool, str]:
+def validate_json_credentials(env: Dict[str, str]) -> Tuple[bool, str]:
+    """
+    Валидация JSON ключей Google API
+    
+    Args:
+        env: Снимок переменных окружения
+        
+    Returns:
+        Кортеж (валидный, сообщение об ошибке)
+    """
+    # Значение из одних пробелов считается незаданным; ключ сервисного аккаунта -
+    # JSON-объект, поэтому остальное отсекается по первому символу без парсера
+    json_content = env.get('GOOGLE_CREDENTIALS_JSON', '').lstrip()
+    if json_content and json_content[0] != '{':
+        return False, "GOOGLE_CREDENTIALS_JSON не похож на JSON"
+    
+    credentials_file = env.get('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
+    
+    # Файл нужен только без прямого JSON; изменение файла меняет ключ кэша
+    file_stamp = None
+    if not json_content:
+        try:
+            st = os.stat(credentials_file)
+            file_stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+    
+    return _validate_creds_cached(json_content, credentials_file, file_stamp)
+
+def validate_spreadsheet_id(env: Dict[str, str]) -> Tuple[bool, str]:
     """
     Валидация ID Google таблицы
     
+    Args:
+        env: Снимок переменных окружения
+        
     Returns:
         Кортеж (валидный, сообщение)
     """
-    spreadsheet_id = os.getenv('SPREADSHEET_ID', '')
+    spreadsheet_id = env.get('SPREADSHEET_ID', '')
     if not spreadsheet_id:
         return False, "SPREADSHEET_ID не указан"
     
     # Проверяем формат ID (обычно содержит буквы, цифры, дефисы и подчеркивания)
-    if len(spreadsheet_id) < 20 or not all(c.isalnum() or c in '-_' for c in spreadsheet_id):
+    if not _SHEET_ID_RE.match(spreadsheet_id):
         return False, f"Невалидный формат SPREADSHEET_ID: {spreadsheet_id}"
     
     return True, f"SPREADSHEET_ID выглядит корректно: {spreadsheet_id}"
 
-def validate_telegram_token() -> Tuple[bool, str]:
+def validate_telegram_token(env: Dict[str, str]) -> Tuple[bool, str]:
     """
     Валидация токена Telegram бота
     
+    Args:
+        env: Снимок переменных окружения
+        
     Returns:
         Кортеж (валидный, сообщение)
     """
-    token = os.getenv('BOT_TOKEN') or os.getenv('TELEGRAM_TOKEN')
+    token = next((value for value in (env.get('BOT_TOKEN'), env.get('TELEGRAM_TOKEN')) if _nonblank(value)), None)
     if not token:
         return False, "BOT_TOKEN не указан"
     
-    # Проверяем формат токена (например: 123456789:ABC-DEF1234ghIkl-zyx57W2v1u123ew11)
-    if ':' not in token or len(token) < 35:
+    # Проверяем формат токена: числовой ID бота, двоеточие и секрет;
+    # позиция двоеточия сразу отсекает явно неверные токены без регулярки
+    pos = token.find(':')
+    if pos < 5 or len(token) - pos - 1 < 30 or not _TG_TOKEN_RE.match(token):
         return False, f"Невалидный формат BOT_TOKEN"
     
     return True, "BOT_TOKEN выглядит корректно"
 
-def validate_ids(var_name: str, description: str) -> Tuple[bool, str]:
+def validate_ids(env: Dict[str, str], var_name: str, description: str) -> Tuple[bool, str]:
     """
     Валидация списка ID
     
     Args:
+        env: Снимок переменных окружения
         var_name: Название переменной
         description: Описание переменной
         
     Returns:
         Кортеж (валидный, сообщение)
     """
-    ids_str = os.getenv(var_name, '')
+    ids_str = env.get(var_name, '')
     if not ids_str:
         return True, f"{description}: не указано (опционально)"
     
-    try:
-        ids = [x.strip() for x in ids_str.split(',') if x.strip()]
-        # Проверяем что все ID являются числами (могут быть отрицательными для групп)
-        for id_str in ids:
-            int(id_str)
-        
-        return True, f"{description}: найдено {len(ids)} ID"
-    except ValueError:
+    # Формат проверяется одним проходом регулярки вместо int() для каждого элемента
+    if not _IDS_LIST_RE.match(ids_str):
         return False, f"{description}: содержит некорректные ID"
+    
+    return True, f"{description}: найдено {len(_ID_RE.findall(ids_str))} ID"
 
-def main():
+def _write_lines(lines: List[str]) -> None:
+    """
+    Вывод отчета одной записью в stdout
+    
+    Args:
+        lines: Строки отчета
+    """
+    text = "\n".join(lines) + "\n"
+    # На терминалах без UTF-8 эмодзи заменяются, а не роняют вывод
+    encoding = sys.stdout.encoding or 'utf-8'
+    if encoding.lower().replace('-', '') != 'utf8':
+        text = text.encode(encoding, 'replace').decode(encoding)
+    sys.stdout.write(text)
+
+def _report_checks(required_vars: List[Tuple[str, str, bool]], params: List[Tuple[str, bool, str]],
+                   ids_results: List[Tuple[bool, str]], optional_vars: List[Tuple[str, str, bool]]) -> List[Dict]:
+    """
+    Сборка результатов проверки для вывода в JSON
+    
+    Args:
+        required_vars: Результаты проверки обязательных переменных
+        params: Кортежи (параметр, валидный, сообщение)
+        ids_results: Результаты проверки списков ID
+        optional_vars: Результаты проверки опциональных переменных
+        
+    Returns:
+        Список проверок {'group', 'name', 'ok', 'message'}
+    """
+    checks = [{'group': 'required', 'name': var_name, 'ok': is_found, 'message': description}
+              for var_name, description, is_found in required_vars]
+    checks.extend({'group': 'params', 'name': name, 'ok': is_valid, 'message': message}
+                  for name, is_valid, message in params)
+    checks.extend({'group': 'ids', 'name': var_name, 'ok': is_valid, 'message': message}
+                  for var_name, (is_valid, message) in zip(_ID_VARS, ids_results))
+    checks.extend({'group': 'optional', 'name': var_name, 'ok': is_found, 'message': description}
+                  for var_name, description, is_found in optional_vars)
+    return checks
+
+def main(argv: Optional[List[str]] = None) -> int:
     """Основная функция валидации"""
-    print("🔍 Проверка конфигурации Telegram-бота")
-    print("=" * 60)
+    parser = argparse.ArgumentParser(description="Проверка конфигурации Telegram-бота")
+    parser.add_argument('--json', action='store_true', help="вывести результат одной строкой JSON")
+    args = parser.parse_args(argv)
+    
+    env = _snapshot_env()
+    required_vars = check_required_env_vars(env)
+    params = [
+        ('Telegram Token', *validate_telegram_token(env)),
+        ('Google Credentials', *validate_json_credentials(env)),
+        ('Spreadsheet ID', *validate_spreadsheet_id(env)),
+    ]
+    ids_results = [validate_ids(env, var_name, description) for var_name, description in _ID_VARS.items()]
+    optional_vars = check_optional_env_vars(env)
+    
+    all_valid = (all(is_found for _, _, is_found in required_vars)
+                 and all(is_valid for _, is_valid, _ in params)
+                 and all(is_valid for is_valid, _ in ids_results))
+    
+    # Машиночитаемый вывод для CI и healthcheck: одна строка без оформления,
+    # только ASCII (кириллица экранируется), поэтому не зависит от кодировки stdout
+    if args.json:
+        report = {'ok': all_valid, 'checks': _report_checks(required_vars, params, ids_results, optional_vars)}
+        sys.stdout.write(json.dumps(report) + "\n")
+        return 0 if all_valid else 1
     
-    all_valid = True
+    out: List[str] = [_HEADER, _RULE]
+    emit = out.append
     
     # Проверка обязательных переменных
-    print("\n📋 Обязательные переменные:")
-    required_vars = check_required_env_vars()
-    for var_name, description, is_found in required_vars:
-        status = "✅" if is_found else "❌"
-        print(f"  {status} {var_name}: {description}")
-        if not is_found:
-            all_valid = False
+    emit("\n📋 Обязательные переменные:")
+    out.extend(_ROW % (_OK_MARK[is_found], var_name, description)
+               for var_name, description, is_found in required_vars)
     
     # Валидация специфических параметров
-    print("\n🔧 Валидация параметров:")
-    
-    # Telegram токен
-    token_valid, token_msg = validate_telegram_token()
-    status = "✅" if token_valid else "❌"
-    print(f"  {status} Telegram Token: {token_msg}")
-    if not token_valid:
-        all_valid = False
-    
-    # Google credentials
-    creds_valid, creds_msg = validate_json_credentials()
-    status = "✅" if creds_valid else "❌"
-    print(f"  {status} Google Credentials: {creds_msg}")
-    if not creds_valid:
-        all_valid = False
-    
-    # Spreadsheet ID
-    sheet_valid, sheet_msg = validate_spreadsheet_id()
-    status = "✅" if sheet_valid else "❌"
-    print(f"  {status} Spreadsheet ID: {sheet_msg}")
-    if not sheet_valid:
-        all_valid = False
+    emit("\n🔧 Валидация параметров:")
+    out.extend(_ROW % (_OK_MARK[is_valid], name, message) for name, is_valid, message in params)
     
     # ID списки
-    for var_name, description in [('ADMIN_IDS', 'Admin IDs'), ('REPORT_CHAT_ID', 'Report Chat IDs')]:
-        ids_valid, ids_msg = validate_ids(var_name, description)
-        status = "✅" if ids_valid else "⚠️"
-        print(f"  {status} {ids_msg}")
-        if not ids_valid:
-            all_valid = False
+    out.extend(_IDS_ROW % (_WARN_MARK[ids_valid], ids_msg) for ids_valid, ids_msg in ids_results)
     
     # Проверка опциональных переменных
-    print("\n📝 Опциональные переменные:")
-    optional_vars = check_optional_env_vars()
-    for var_name, description, is_found in optional_vars:
-        status = "✅" if is_found else "⚪"
-        print(f"  {status} {var_name}: {description}")
+    emit("\n📝 Опциональные переменные:")
+    out.extend(_ROW % (_OPT_MARK[is_found], var_name, description)
+               for var_name, description, is_found in optional_vars)
     
     # Итоговый результат
-    print("\n" + "=" * 60)
+    emit("\n" + _RULE)
     if all_valid:
-        print("🎉 Конфигурация валидна! Бот готов к запуску.")
+        emit("🎉 Конфигурация валидна! Бот готов к запуску.")
+        _write_lines(out)
         return 0
     else:
-        print("❌ Обнаружены ошибки в конфигурации. Исправьте их перед запуском.")
-        print("\n💡 Подсказки:")
-        print("  1. Скопируйте .env.example в .env")
-        print("  2. Заполните обязательные переменные")
-        print("  3. Получите токен бота у @BotFather")
-        print("  4. Настройте Google API credentials")
+        out.extend(_FAILURE_LINES)
+        _write_lines(out)
         return 1
 
 if __name__ == "__main__":